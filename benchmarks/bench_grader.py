@@ -0,0 +1,120 @@
+"""
+End-to-end benchmark of the grader on synthetic cohorts of different sizes and numbers of cores.
+
+For every combination of cohort size and cores a fresh cohort is generated (see synthetic_cohort.py) and graded with profiling on.
+Reports the throughput (students per second) and the latency per student, and can compare the results with a previous run
+to catch performance regressions.
+    python benchmarks/bench_grader.py --sizes 50 200 --cores 1 4 --output bench.json
+    python benchmarks/bench_grader.py --sizes 50 200 --cores 1 4 --baseline bench.json --tolerance 0.15
+Any other arguments are passed to the grader, for example --cache_solution or --timeout_engine itimer.
+The grader runs with a memory limit of MEMORY_LIMIT_MB unless --memory_limit_mb is given.
+"""
+import sys
+import json
+import pathlib
+import argparse
+import tempfile
+import contextlib
+from timeit import default_timer as timer
+
+import numpy as np
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+from run_grader import create_parser
+from grader import Grader
+from synthetic_cohort import generate_cohort, MEMORY_HUNGRY_MB
+
+BENCH_DIR = pathlib.Path(__file__).resolve().parent
+
+# Memory limit of the grader (in MB), low enough that memory_hungry students run out of memory
+MEMORY_LIMIT_MB = MEMORY_HUNGRY_MB // 2
+
+
+def run_benchmark(solution_file: pathlib.Path, n_students: int, cores: int, seed: int, grader_args: list):
+    """Grades a synthetic cohort of n_students with the given number of cores and returns the measurements."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        student_dir = pathlib.Path(tmp_dir)
+
+        # Module names must be unique across runs as imported student modules stay in sys.modules
+        cohort = generate_cohort(solution_file, student_dir, n_students, seed, assignment=f'bench{n_students}x{cores}')
+        # The memory limit comes before the grader arguments so they can override it
+        args = create_parser().parse_args(['-sol', str(solution_file), '-sd', str(student_dir), '-mp', str(cores), '--profile',
+                                           '-ml', str(MEMORY_LIMIT_MB)] + grader_args)
+
+        with open(student_dir / 'grader_output.txt', 'w') as output_file:
+            with contextlib.redirect_stdout(output_file), contextlib.redirect_stderr(output_file):
+                start_t = timer()
+                grader = Grader(args)
+                grader.grade_all_students()
+                total_sec = timer() - start_t
+
+        report = json.loads((student_dir / f'{solution_file.stem}_profile.json').read_text())
+        kinds_sec = {}
+        for record in report['students']:
+            kinds_sec.setdefault(cohort[pathlib.Path(record['fpath'])], []).append(record['total_sec'])
+        cohort_report = report['cohort']
+
+        return {
+            'n_students': n_students,
+            'n_submissions': len(cohort),
+            'cores': cores,
+            'total_sec': total_sec,
+            'students_per_sec': len(cohort) / total_sec,
+            'student_sec_p50': cohort_report['student_sec_p50'],
+            'student_sec_p95': cohort_report['student_sec_p95'],
+            'student_sec_max': cohort_report['student_sec_max'],
+            'phases_share': cohort_report['phases_share'],
+            'kinds_sec_mean': {kind: float(np.mean(kind_sec)) for kind, kind_sec in sorted(kinds_sec.items())},
+            'mean_final_grade': float(grader.df['final_grade'].mean()),
+        }
+
+
+def find_regressions(results: list, baseline: list, tolerance: float):
+    """Compares the throughput of each run with the baseline run of the same size and cores."""
+    baseline_runs = {(run['n_students'], run['cores']): run for run in baseline}
+    regressions = []
+    for run in results:
+        baseline_run = baseline_runs.get((run['n_students'], run['cores']))
+        if baseline_run is None:
+            continue
+
+        ratio = run['students_per_sec'] / baseline_run['students_per_sec']
+        print(f'[Bench] n={run["n_students"]} cores={run["cores"]} throughput is {ratio:.2f}x the baseline')
+        if ratio < 1 - tolerance:
+            regressions.append(run)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-sol', '--solution_file', type=pathlib.Path, required=False, default=BENCH_DIR / 'bench_solution.py')
+    parser.add_argument('--sizes', type=int, nargs='+', required=False, default=[50, 200])
+    parser.add_argument('--cores', type=int, nargs='+', required=False, default=[1, 4])
+    parser.add_argument('-seed', '--seed', type=int, required=False, default=0, help='Seed of the synthetic cohorts and of the test cases')
+    parser.add_argument('-o', '--output', type=pathlib.Path, required=False, help='Save the results as JSON to use as a baseline later')
+    parser.add_argument('-b', '--baseline', type=pathlib.Path, required=False, help='Results of a previous run to compare with')
+    parser.add_argument('-tol', '--tolerance', type=float, required=False, default=0.15, help='Allowed throughput drop from the baseline before failing')
+    args, grader_args = parser.parse_known_args()
+
+    # Small limits so the infinite loops do not dominate the benchmark, unless given otherwise
+    grader_args = ['--seed', str(args.seed), '--timeout_engine', 'budget', '--timeout_s', '0.05', '--timeout_budget_s', '0.5'] + grader_args
+
+    results = []
+    for n_students in args.sizes:
+        for cores in args.cores:
+            result = run_benchmark(args.solution_file.resolve(), n_students, cores, args.seed, grader_args)
+            results.append(result)
+            print(f'[Bench] n={n_students:>5} ({result["n_submissions"]} submissions) cores={cores:>2} | {result["total_sec"]:7.2f}s '
+                  f'| {result["students_per_sec"]:7.2f} submissions/s | per submission p50={result["student_sec_p50"]:.3f}s '
+                  f'p95={result["student_sec_p95"]:.3f}s max={result["student_sec_max"]:.3f}s | mean grade={result["mean_final_grade"]:.1f}')
+            print(f'[Bench] {"":>5} mean seconds by kind = { {kind: round(sec, 3) for kind, sec in result["kinds_sec_mean"].items()} }')
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f'[Bench] Results saved to {args.output}')
+
+    if args.baseline:
+        regressions = find_regressions(results, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print(f'[Bench] {len(regressions)} runs regressed more than {args.tolerance*100:.0f}% from the baseline')
+            sys.exit(1)
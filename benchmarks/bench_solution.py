@@ -0,0 +1,30 @@
+"""
+Solution used by benchmarks/bench_grader.py to grade synthetic cohorts.
+
+The functions are small on purpose so the benchmark measures the grader and not the exercise.
+"""
+import numpy as np
+import grader
+
+
+@grader.generate_test_case(__trials__=100, L=lambda: list(np.random.randint(0, 100, 20)), k=lambda: int(np.random.randint(-10, 110)))
+def contains(L, k):
+    return k in L
+
+
+@grader.generate_test_case(__trials__=100, L=lambda: list(np.random.randint(0, 1000, 50)))
+def sort_list(L):
+    return sorted(L)
+
+
+@grader.generate_test_case(__trials__=100, a=lambda: np.random.rand(100))
+def normalize(a):
+    return (a - a.min()) / (a.max() - a.min())
+
+
+@grader.generate_test_case(__trials__=50, n=lambda: int(np.random.randint(0, 20)))
+def fibonacci(n):
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
@@ -0,0 +1,96 @@
+"""
+Benchmark of the command-line startup of the grader.
+
+Measures how long "run_grader.py --help" and a single-student regrade take in a fresh interpreter,
+lists the slowest imports (like python -X importtime), and checks that the heavy libraries are only imported when needed.
+Exits with an error when a check fails or a time limit is exceeded so it can be run as a check before merging.
+    python benchmarks/bench_startup.py --runs 5
+"""
+import sys
+import pathlib
+import argparse
+import tempfile
+import subprocess
+from timeit import default_timer as timer
+
+from synthetic_cohort import generate_cohort
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parent.parent
+BENCH_DIR = pathlib.Path(__file__).resolve().parent
+
+# Modules that must not be imported by each command
+LAZY_CHECKS = [
+    (['-c', 'import grader'], ['pandas', 'matplotlib', 'tqdm']),
+    (['run_grader.py', '--help'], ['pandas', 'numpy', 'matplotlib', 'tqdm']),
+]
+
+
+def run_python(python_args: list):
+    """Runs python in the repository directory and returns the wall time, the standard error, and the return code."""
+    start_t = timer()
+    result = subprocess.run([sys.executable] + python_args, cwd=ROOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return timer() - start_t, result.stderr, result.returncode
+
+
+def min_wall_time(python_args: list, runs: int):
+    return min(run_python(python_args)[0] for _ in range(runs))
+
+
+def parse_importtime(stderr: str):
+    """Parses the output of -X importtime into a dictionary of module name to cumulative import seconds."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, self_us, cumulative_us, module_name = [part.strip() for part in line.replace('import time:', '|', 1).split('|')]
+        modules[module_name] = int(cumulative_us) / 1e6
+    return modules
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', '--runs', type=int, required=False, default=5)
+    parser.add_argument('-n', '--top', type=int, required=False, default=15, help='How many of the slowest imports to show')
+    parser.add_argument('--max_help_s', type=float, required=False, default=0.5, help='Fail if "run_grader.py --help" takes longer')
+    parser.add_argument('--max_regrade_s', type=float, required=False, default=2.0, help='Fail if grading a single student takes longer')
+    args = parser.parse_args()
+
+    failures = []
+
+    # Heavy libraries must only be imported when they are used
+    for python_args, lazy_modules in LAZY_CHECKS:
+        _, stderr, _ = run_python(['-X', 'importtime'] + python_args)
+        imported = [module_name for module_name in lazy_modules if module_name in parse_importtime(stderr)]
+        print(f'[Bench] python {" ".join(python_args)} imports {imported if imported else "none"} of {lazy_modules}')
+        if imported:
+            failures.append(f'python {" ".join(python_args)} imported {imported}')
+
+    help_sec = min_wall_time(['run_grader.py', '--help'], args.runs)
+    print(f'[Bench] run_grader.py --help took {help_sec:.3f}s (fastest of {args.runs})')
+    if help_sec > args.max_help_s:
+        failures.append(f'--help took {help_sec:.3f}s, more than {args.max_help_s}s')
+
+    # Regrade one correct student of a synthetic cohort
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        student_dir = pathlib.Path(tmp_dir)
+        generate_cohort(BENCH_DIR / 'bench_solution.py', student_dir, 1, mix={'correct': 1})
+        regrade_args = ['run_grader.py', '-sol', str(BENCH_DIR / 'bench_solution.py'), '-sd', str(student_dir), '-s', 'student0000']
+
+        regrade_sec = min_wall_time(regrade_args, args.runs)
+        print(f'[Bench] Regrading a single student took {regrade_sec:.3f}s (fastest of {args.runs})')
+        if regrade_sec > args.max_regrade_s:
+            failures.append(f'regrading a single student took {regrade_sec:.3f}s, more than {args.max_regrade_s}s')
+
+        _, stderr, return_code = run_python(['-X', 'importtime'] + regrade_args)
+        assert return_code == 0, f'[Debug] Regrading failed\n{stderr}'
+
+    print(f'[Bench] Slowest imports of a single student regrade (cumulative)')
+    modules = parse_importtime(stderr)
+    top_level = {module_name: sec for module_name, sec in modules.items() if '.' not in module_name}
+    for module_name, sec in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f'[Bench] {module_name:>30} {sec*1000:8.1f}ms')
+
+    if failures:
+        for failure in failures:
+            print(f'[Bench] FAILED: {failure}')
+        sys.exit(1)
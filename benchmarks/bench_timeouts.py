@@ -0,0 +1,38 @@
+"""
+Microbenchmark of the per-call overhead of each timeout engine.
+
+Runs a function that does (almost) nothing many times through each engine and reports the average time per call.
+    python benchmarks/bench_timeouts.py --calls 20000
+"""
+import sys
+import pathlib
+import argparse
+from timeit import default_timer as timer
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+from grader.timeouts import TIMEOUT_ENGINES, create_timeout_engine
+
+
+def noop(x):
+    return x
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', '--calls', type=int, required=False, default=20000)
+    args = parser.parse_args()
+
+    # Calling the function directly is the lower bound
+    start_t = timer()
+    for idx in range(args.calls):
+        noop(idx)
+    baseline_us = (timer() - start_t) / args.calls * 1e6
+    print(f'{"no timeout":>10} | {baseline_us:8.2f}us per call')
+
+    for engine_name in TIMEOUT_ENGINES:
+        engine = create_timeout_engine(engine_name, timeout_s=1, budget_s=args.calls)
+        start_t = timer()
+        for idx in range(args.calls):
+            engine.run('noop', noop, idx)
+        engine_us = (timer() - start_t) / args.calls * 1e6
+        print(f'{engine_name:>10} | {engine_us:8.2f}us per call | {engine_us - baseline_us:8.2f}us overhead')
@@ -0,0 +1,126 @@
+"""
+Generates a synthetic cohort of student submissions from a solution file for benchmarking the grader.
+
+Every student is derived from the solution (with the grader annotations removed) and then given one of the following behaviors:
+    correct, wrong, slow, infinite_loop, exception, print_heavy, import_failing, memory_hungry
+Files are named like Blackboard bulk downloads and some students get several attempts.
+    python benchmarks/synthetic_cohort.py -sol benchmarks/bench_solution.py -o _data_/bench -n 200
+"""
+import ast
+import random
+import pathlib
+import argparse
+import datetime
+
+# How often each kind of student appears in the cohort
+DEFAULT_MIX = {
+    'correct': 0.45,
+    'wrong': 0.15,
+    'slow': 0.08,
+    'infinite_loop': 0.04,
+    'exception': 0.1,
+    'print_heavy': 0.08,
+    'import_failing': 0.04,
+    'memory_hungry': 0.06,
+}
+
+# How much memory (in MB) memory_hungry students allocate, more than the memory limit of the benchmarks
+MEMORY_HUNGRY_MB = 512
+
+# Fraction of students that submit more than one attempt, and the most attempts a student can submit
+MULTIPLE_ATTEMPTS_RATE = 0.2
+MAX_ATTEMPTS = 3
+
+
+def strip_grader(solution_src: str):
+    """Removes the grader import and all annotations from the solution code so it looks like student code."""
+    tree = ast.parse(solution_src)
+    tree.body = [node for node in tree.body
+                 if not (isinstance(node, ast.Import) and any(alias.name == 'grader' for alias in node.names))
+                 and not (isinstance(node, ast.ImportFrom) and node.module == 'grader')]
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            node.decorator_list = []
+    return tree
+
+
+def __graded_functions__(tree):
+    return [node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef) and node.name != '__init__']
+
+
+def __statements__(src: str):
+    return ast.parse(src).body
+
+
+def make_student(tree, kind: str, rng: random.Random):
+    """Creates the source code of a student of the given kind from the stripped solution."""
+    tree = ast.parse(ast.unparse(tree))
+    fns = __graded_functions__(tree)
+    fn = rng.choice(fns)
+
+    if kind == 'wrong':
+        fn.body = __statements__('return None')
+    elif kind == 'slow':
+        for fn in fns:
+            fn.body = __statements__('import time\ntime.sleep(0.001)') + fn.body
+    elif kind == 'infinite_loop':
+        fn.body = __statements__('while True:\n    pass')
+    elif kind == 'exception':
+        fn.body = __statements__('raise ValueError("synthetic student exception")')
+    elif kind == 'print_heavy':
+        for fn in fns:
+            fn.body = __statements__('for _ in range(20):\n    print("debugging output " * 10)') + fn.body
+    elif kind == 'import_failing':
+        tree.body = __statements__('import a_module_that_does_not_exist') + tree.body
+    elif kind == 'memory_hungry':
+        fn.body = __statements__(f'_scratch = bytearray({MEMORY_HUNGRY_MB} * 1024 * 1024)') + fn.body
+    elif kind != 'correct':
+        raise Exception(f'[Debug] Unknown synthetic student kind {kind}, must be one of {list(DEFAULT_MIX.keys())}')
+
+    return ast.unparse(ast.fix_missing_locations(tree)) + '\n'
+
+
+def generate_cohort(solution_file: pathlib.Path, out_dir: pathlib.Path, n_students: int, seed: int = 0, mix: dict = None,
+                    assignment: str = 'benchexercise'):
+    """
+    Writes the submissions of "n_students" synthetic students to out_dir.
+
+    Returns a dictionary from the path of every submission to the kind of student that wrote it.
+    """
+    assert '_' not in assignment, f'The assignment name {assignment} cannot contain "_" as it separates the Blackboard filename fields'
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    tree = strip_grader(solution_file.read_text())
+
+    if not out_dir.exists():
+        out_dir.mkdir(parents=True)
+
+    kinds = list(mix.keys())
+    weights = list(mix.values())
+    start_date = datetime.datetime(2021, 1, 1)
+    cohort = {}
+    for student_idx in range(n_students):
+        n_attempts = rng.randint(2, MAX_ATTEMPTS) if rng.random() < MULTIPLE_ATTEMPTS_RATE else 1
+        for attempt_idx in range(n_attempts):
+            kind = rng.choices(kinds, weights)[0]
+            date = start_date + datetime.timedelta(minutes=student_idx * MAX_ATTEMPTS + attempt_idx)
+            fpath = out_dir / f'{assignment}_student{student_idx:04d}_attempt_{date:%Y-%m-%d-%H-%M-%S}_{solution_file.stem}.py'
+            fpath.write_text(make_student(tree, kind, rng))
+            cohort[fpath] = kind
+
+    return cohort
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-sol', '--solution_file', type=pathlib.Path, required=True)
+    parser.add_argument('-o', '--output_dir', type=pathlib.Path, required=True)
+    parser.add_argument('-n', '--students', type=int, required=False, default=100)
+    parser.add_argument('-seed', '--seed', type=int, required=False, default=0)
+    args = parser.parse_args()
+
+    cohort = generate_cohort(args.solution_file, args.output_dir, args.students, args.seed)
+    kinds = list(cohort.values())
+    print(f'[Debug] Wrote {len(cohort)} submissions of {args.students} students to {args.output_dir}')
+    for kind in DEFAULT_MIX.keys():
+        print(f'[Debug] {kind:>15} {kinds.count(kind)}')
@@ -1,3 +1,16 @@
-from .grader import Grader
-from .feedback import compare_outputs
-from .annotations import generate_class, generate_custom_comparer, generate_test_case, no_test_cases, set_test_case, extra_credit
+import importlib
+
+from .annotations import generate_class, generate_custom_comparer, generate_test_case, generate_test_case_batch, no_test_cases, set_test_case, extra_credit, adaptive_trials, complexity_test
+
+# Imported when first used (PEP 562) so solution files and the command-line do not pay for pandas and numpy on "import grader"
+LAZY_ATTRIBUTES = {
+    'Grader': '.grader',
+    'compare_outputs': '.feedback',
+    'register_comparer': '.feedback',
+}
+
+
+def __getattr__(name):
+    if name in LAZY_ATTRIBUTES:
+        return getattr(importlib.import_module(LAZY_ATTRIBUTES[name], __name__), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
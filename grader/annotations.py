@@ -72,7 +72,40 @@ def generate_test_case(__trials__=2500, **fn_kwargs):
         wrapper.max_trials = __trials__
         wrapper.fn_kwargs = fn_kwargs
         wrapper.gen_fn_params = __gen_fn_params__
-        wrapper.param_names = inspect.getargspec(func)[0]
+        wrapper.param_names = inspect.getfullargspec(func).args
+        return wrapper
+    return decorator
+
+
+def generate_test_case_batch(__trials__=2500, **batch_kwargs):
+    """
+    Like generate_test_case() but each parameter function receives the number of trials and returns the values of all trials at once.
+
+    For example, k=lambda n: np.random.randint(-100, 200, n) generates all values of k with one vectorized call.
+    """
+
+    def __gen_batch_params__():
+        batch = {}
+        for k_name, k_fn in batch_kwargs.items():
+            batch[k_name] = k_fn(__trials__)
+            assert len(batch[k_name]) == __trials__, f'[Debug] Batch generator "{k_name}" must return {__trials__} values but returned {len(batch[k_name])}'
+        return batch
+
+    def decorator(func):
+        assert not hasattr(func, 'equality_fn'), f'[Debug] Custom comparer annotation must be on top of test case annotation'
+        assert type(__trials__) == int, f'[Debug] Error while annotating function "{func.__name__}" [{__trials__} must be an int]'
+        assert __trials__ > 0, f'[Debug] Error while annotating function "{func.__name__}" [{__trials__} must be greater than 0]'
+        for k_name, k_fn in batch_kwargs.items():
+            assert callable(k_fn), f'[Debug] Error while annotating function "{func.__name__}" ["{k_name}" has to be a function taking the number of trials, did you forget to include lambda?]'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+
+        wrapper.max_trials = __trials__
+        wrapper.batch_kwargs = batch_kwargs
+        wrapper.gen_batch_params = __gen_batch_params__
+        wrapper.param_names = inspect.getfullargspec(func).args
         return wrapper
     return decorator
 
@@ -94,7 +127,7 @@ def set_test_case(**set_kwargs):
             return func(*args, **kwargs)
 
         params = []
-        param_names = inspect.getargspec(func)[0]
+        param_names = inspect.getfullargspec(func).args
         for parameter_tuple in tuple(itertools.product(*set_kwargs.values())):
             D = {}
             for (param_value, param_name) in zip(parameter_tuple, param_names):
@@ -127,3 +160,54 @@ def extra_credit():
         wrapper.extra_credit = True
         return wrapper
     return decorator
+
+
+def adaptive_trials(resolution=0.02, confidence=0.95, min_trials=50):
+    """Stops running test cases once the pass rate of the student is known to within +/- resolution with the given confidence."""
+    def decorator(func):
+        assert 0 < resolution < 1, f'[Debug] Error while annotating function "{func.__name__}" [resolution must be between 0 and 1]'
+        assert 0 < confidence < 1, f'[Debug] Error while annotating function "{func.__name__}" [confidence must be between 0 and 1]'
+        assert type(min_trials) == int and min_trials > 0, f'[Debug] Error while annotating function "{func.__name__}" [min_trials must be an int greater than 0]'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+        wrapper.adaptive_trials = {'resolution': resolution, 'confidence': confidence, 'min_trials': min_trials}
+        return wrapper
+    return decorator
+
+
+def complexity_test(__min_size__=100, __max_size__=10000, __n_sizes__=6, __repeats__=5, __weight__=0.25, __tolerance__=0.3, **size_kwargs):
+    """
+    Also grades how the running time of the function grows with the size of its input compared to the solution.
+
+    Each parameter function receives the input size n, for example L=lambda n: list(np.random.randint(0, 100, n)).
+    Must be on top of a test case annotation, the complexity score is "__weight__" of the grade of the function.
+    """
+
+    def __gen_size_params__(size):
+        params = {}
+        for k_name, k_fn in size_kwargs.items():
+            params[k_name] = k_fn(size)
+        return params
+
+    def decorator(func):
+        assert hasattr(func, 'max_trials'), f'[Debug] Complexity annotation must be on top of test case annotation'
+        assert not hasattr(func, 'gen_class_params'), f'[Debug] Error while annotating function "{func.__name__}" [Complexity tests of class functions are not supported]'
+        assert 0 < __min_size__ < __max_size__, f'[Debug] Error while annotating function "{func.__name__}" [__min_size__ must be positive and smaller than __max_size__]'
+        assert type(__n_sizes__) == int and __n_sizes__ >= 3, f'[Debug] Error while annotating function "{func.__name__}" [__n_sizes__ must be an int of at least 3]'
+        assert type(__repeats__) == int and __repeats__ > 0, f'[Debug] Error while annotating function "{func.__name__}" [__repeats__ must be an int greater than 0]'
+        assert 0 < __weight__ <= 1, f'[Debug] Error while annotating function "{func.__name__}" [__weight__ must be between 0 and 1]'
+        assert 0 <= __tolerance__ < 1, f'[Debug] Error while annotating function "{func.__name__}" [__tolerance__ must be between 0 and 1]'
+        for k_name, k_fn in size_kwargs.items():
+            assert callable(k_fn), f'[Debug] Error while annotating function "{func.__name__}" ["{k_name}" has to be a function taking the input size, did you forget to include lambda?]'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+
+        wrapper.complexity = {'min_size': __min_size__, 'max_size': __max_size__, 'n_sizes': __n_sizes__,
+                              'repeats': __repeats__, 'weight': __weight__, 'tolerance': __tolerance__}
+        wrapper.gen_size_params = __gen_size_params__
+        return wrapper
+    return decorator
@@ -0,0 +1,67 @@
+import pathlib
+
+
+def parse_attempt(fpath: pathlib.Path):
+    """
+    Splits a Blackboard bulk download filename in the format {assignment name}_{student username}_attempt_{date}_{filename}.
+
+    Returns (student username, date) or None if it is not a Blackboard file.
+    """
+    split_filename = fpath.stem.split('_')
+    if len(split_filename) < 4:
+        return None
+    return split_filename[1], split_filename[3]
+
+
+class AttemptIndex:
+    """
+    Blackboard attempts of every student sorted by date, built once from all the student files.
+
+    Attempts are numbered from 1 in the order of their dates, and attempts submitted at the same date get the same number.
+    Files that are not Blackboard attempts are not in the index.
+    """
+
+    def __init__(self, student_files):
+        # Student username -> [(date, path)] sorted by date
+        self.attempts = {}
+        for fpath in student_files:
+            parsed = parse_attempt(fpath)
+            if parsed is None:
+                continue
+            student_name, date = parsed
+            self.attempts.setdefault(student_name, []).append((date, fpath))
+
+        self.attempt_numbers = {}
+        for student_name, attempts in self.attempts.items():
+            attempts.sort()
+            date_numbers = {}
+            for idx, (date, _) in enumerate(attempts):
+                date_numbers.setdefault(date, idx + 1)
+            for date, fpath in attempts:
+                self.attempt_numbers[fpath] = date_numbers[date]
+
+    def __len__(self):
+        return len(self.attempt_numbers)
+
+    def attempt_number(self, fpath: pathlib.Path):
+        """Gets the number of the given attempt among the attempts of its student."""
+        assert fpath in self.attempt_numbers, f'[Debug] {fpath} is not one of the indexed student files'
+        return self.attempt_numbers[fpath]
+
+    def student_attempts(self, student_name: str):
+        """Gets the attempts of the given student username sorted by date."""
+        return [fpath for _, fpath in self.attempts.get(student_name, [])]
+
+    def latest_attempt(self, fpath: pathlib.Path):
+        """Gets the most recent attempt of the student that submitted the given attempt (the file itself if it is not an attempt)."""
+        parsed = parse_attempt(fpath)
+        if parsed is None or parsed[0] not in self.attempts:
+            return fpath
+        return self.attempts[parsed[0]][-1][1]
+
+    def older_attempts(self, fpath: pathlib.Path):
+        """Gets the attempts superseded by the most recent attempt of the student that submitted the given attempt."""
+        parsed = parse_attempt(fpath)
+        if parsed is None:
+            return []
+        return self.student_attempts(parsed[0])[:-1]
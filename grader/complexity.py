@@ -0,0 +1,81 @@
+import numpy as np
+
+from grader.isolation import isolate_params
+
+# Running times below this are mostly call overhead so they are clipped before fitting
+MIN_DURATION_SEC = 1e-7
+
+
+def geometric_sizes(min_size, max_size, n_sizes):
+    """Spaces n_sizes input sizes evenly on a log scale between min_size and max_size."""
+    return sorted(set(int(round(size)) for size in np.geomspace(min_size, max_size, n_sizes)))
+
+
+def fit_exponent(sizes, durations_sec):
+    """Fits durations_sec = c * size^k with least squares on a log-log scale and returns the growth exponent k."""
+    slope, _ = np.polyfit(np.log(sizes), np.log(np.maximum(durations_sec, MIN_DURATION_SEC)), 1)
+    return float(slope)
+
+
+def exponent_score(sol_exponent, stu_exponent, tolerance):
+    """
+    Scores the growth exponent of the student between 0 and 1.
+
+    Growing up to "tolerance" faster than the solution gets full credit, which then drops linearly
+    to 0 for growing a whole power of n faster (for example O(n^2) against an O(n) solution).
+    """
+    excess = stu_exponent - sol_exponent - tolerance
+    if excess <= 0:
+        return 1.0
+    return max(0.0, 1 - excess / (1 - tolerance))
+
+
+def min_duration(run, params, repeats):
+    """
+    Runs "run" with a fresh copy of the parameters "repeats" times and keeps the fastest run.
+    "run" returns its output and how long the function took, so the solution and the student are timed the same way.
+
+    Noise (other processes, the garbage collector, cache misses) only ever makes a run slower so the minimum is the most stable estimate.
+    Returns the duration and the first exception returned by the run, if any.
+    """
+    best_sec = np.inf
+    for _ in range(repeats):
+        output, duration_sec = run(isolate_params(params))
+        if isinstance(output, Exception):
+            return best_sec, output
+        best_sec = min(best_sec, duration_sec)
+    return best_sec, None
+
+
+class ComplexityTest:
+    """Compares how the running time of a student function grows with the input size against the solution (see @complexity_test)."""
+
+    def __init__(self, fn_name, sol_code, stu_code):
+        self.fn_name = fn_name
+        self.sol_code = sol_code
+        self.stu_code = stu_code
+        self.spec = self.sol_code.solution_fns[fn_name].complexity
+
+    def grade(self):
+        """Times the student function on the same inputs as the solution and returns the complexity score between 0 and 1."""
+        sizes, all_params, sol_durations_sec = self.sol_code.measure_complexity(self.fn_name)
+        sol_exponent = fit_exponent(sizes, sol_durations_sec)
+
+        self.stu_code.log(f'Timing fn="{self.fn_name}" on input sizes {sizes}')
+        stu_durations_sec = []
+        for size, params in zip(sizes, all_params):
+            # Only the student function itself is timed, like the solution, leaving out the time and memory limits around it
+            duration_sec, ex = min_duration(lambda stu_params: self.stu_code.time_fn(self.fn_name, None, stu_params), params, self.spec['repeats'])
+            if ex is not None:
+                self.stu_code.write_feedback(f'###>>> Complexity test stopped at input size n={size} due to [{ex}], assigning a complexity score of 0')
+                return 0
+            stu_durations_sec.append(duration_sec)
+
+        stu_exponent = fit_exponent(sizes, stu_durations_sec)
+        score = exponent_score(sol_exponent, stu_exponent, self.spec['tolerance'])
+
+        self.stu_code.write_feedback(f'###>>> Complexity test over input sizes {sizes} (fastest of {self.spec["repeats"]} runs each)')
+        self.stu_code.write_feedback(lambda: f'\t The Solution Times -> {[f"{sec:.2e}s" for sec in sol_durations_sec]} grows like n^{sol_exponent:.2f}')
+        self.stu_code.write_feedback(lambda: f'\tYour Solution Times -> {[f"{sec:.2e}s" for sec in stu_durations_sec]} grows like n^{stu_exponent:.2f}')
+        self.stu_code.write_feedback(f'###>>> Complexity score = {score*100:.0f} / 100 (weighs {self.spec["weight"]*100:.0f}% of the grade of this function)')
+        return score
@@ -0,0 +1,6 @@
+# Defaults of the command-line arguments, kept in this module without imports so "run_grader.py --help" stays fast
+TIMEOUT_S = 1  # 0.1  # How many seconds should we allow student functions to run before terminating them
+TIMEOUT_BUDGET_S = 30  # How many seconds all test cases of a function can take together when using the "budget" timeout engine
+IMPORT_TIMEOUT_S = 10  # How many seconds the top-level code of the student module can run when it is imported
+TIMEOUT_ENGINES = ['itimer', 'budget', 'cpu', 'wrapt']  # How student functions can be timed out (see grader/timeouts.py)
+WATCH_INTERVAL_S = 2  # How often the student directory is checked for new submissions in --watch mode
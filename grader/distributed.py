@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import shutil
+import socket
+import pathlib
+import argparse
+import tempfile
+import multiprocessing
+
+# How often workers look for new tasks and the coordinator looks for new results
+POLL_S = 0.2
+
+# How many times a task is given to another worker after its lease expired before the student is given up on
+MAX_REQUEUES = 2
+
+# Settings of the coordinator that workers must not copy
+WORKER_OVERRIDES = {'multiprocessing': 1, 'students': None, 'incremental': False, 'resume': False, 'queue_dir': None, 'worker': None}
+
+
+class WorkQueue:
+    """
+    Queue of students to grade stored in a directory, meant to be on a filesystem shared by all the machines (such as NFS).
+
+    The coordinator publishes the job (settings, solution, test bank, and student files) and one task file per student in todo/.
+    Workers claim a task by renaming it into claimed/ (a rename is atomic so only one worker gets it),
+    and send back the scores and feedback of the student as a file in done/.
+    Tasks whose lease expires are put back in todo/ up to MAX_REQUEUES times, then the coordinator gives up on them.
+    """
+
+    def __init__(self, queue_dir: pathlib.Path):
+        self.queue_dir = queue_dir
+        self.job_path = queue_dir / 'job.json'
+        self.finished_path = queue_dir / 'finished'
+        self.solution_dir = queue_dir / 'solution'
+        self.test_bank_dir = queue_dir / 'test_bank'
+        self.students_dir = queue_dir / 'students'
+        self.todo_dir = queue_dir / 'todo'
+        self.claimed_dir = queue_dir / 'claimed'
+        self.done_dir = queue_dir / 'done'
+
+        # Task name -> how many times the coordinator put it back in todo/
+        self.n_requeues = {}
+
+    def publish(self, settings: dict, solution_file: pathlib.Path, test_bank_dir: pathlib.Path, student_files: list, to_grade_files: list):
+        """Clears the queue and publishes a new job. Returns the task name of every student file to grade."""
+        if self.queue_dir.exists():
+            # Only ever delete a queue left by a previous job, never a directory given by mistake
+            assert self.is_queue() or not any(self.queue_dir.iterdir()), \
+                f'[Debug] --queue_dir {self.queue_dir} is not empty and is not a previous queue, refusing to delete it'
+            shutil.rmtree(self.queue_dir)
+        for dir_path in [self.solution_dir, self.students_dir, self.todo_dir, self.claimed_dir, self.done_dir]:
+            dir_path.mkdir(parents=True)
+
+        shutil.copy(solution_file, self.solution_dir / solution_file.name)
+        if test_bank_dir:
+            shutil.copytree(test_bank_dir, self.test_bank_dir)
+        for fpath in student_files:
+            shutil.copy(fpath, self.students_dir / fpath.name)
+
+        task_names = {}
+        for idx, fpath in enumerate(to_grade_files):
+            task_names[f'{idx:06d}'] = fpath
+            (self.todo_dir / f'{idx:06d}').write_text(fpath.name)
+
+        # Write the job last, workers wait for it before looking for tasks
+        job = {'settings': settings, 'solution_name': solution_file.name, 'student_names': [fpath.name for fpath in student_files]}
+        self.__write_atomic__(self.job_path, json.dumps(job, default=str))
+        return task_names
+
+    def is_queue(self):
+        """Determines if the queue directory holds a job published by a coordinator."""
+        return self.job_path.is_file() and all(dir_path.is_dir() for dir_path in [self.todo_dir, self.claimed_dir, self.done_dir])
+
+    def read_job(self):
+        """Waits for the coordinator to publish a job and reads it."""
+        while not self.job_path.exists():
+            time.sleep(POLL_S)
+        return json.loads(self.job_path.read_text())
+
+    def claim(self, worker_id: str):
+        """Claims the next task. Returns the path of the claimed task or None if there are no tasks left right now."""
+        for task_path in sorted(self.todo_dir.glob('*')):
+            claimed_path = self.claimed_dir / f'{task_path.name}.{worker_id}'
+            try:
+                task_path.rename(claimed_path)
+            except FileNotFoundError:
+                # Another worker claimed it first
+                continue
+
+            # The lease starts now, not when the task was published
+            claimed_path.touch()
+            return claimed_path
+        return None
+
+    def complete(self, claimed_path: pathlib.Path, result: dict):
+        """Sends back the result of a claimed task."""
+        task_name = claimed_path.name.split('.')[0]
+        self.__write_atomic__(self.done_dir / f'{task_name}.json', json.dumps(result, default=str))
+        claimed_path.unlink(missing_ok=True)
+
+    def requeue_expired(self, lease_s: float, pending: set):
+        """
+        Puts back the pending tasks claimed more than lease_s seconds ago, as their worker probably died.
+
+        Returns the names of the tasks that expired more than MAX_REQUEUES times, which are removed from the queue instead.
+        """
+        now = time.time()
+        abandoned = []
+        for claimed_path in self.claimed_dir.glob('*'):
+            task_name = claimed_path.name.split('.')[0]
+            try:
+                if now - claimed_path.stat().st_mtime <= lease_s:
+                    continue
+
+                # Another worker already sent the result of a requeued task
+                if task_name not in pending:
+                    claimed_path.unlink()
+                    continue
+
+                # A student that kills every worker or is always slower than the lease must not be graded forever
+                if self.n_requeues.get(task_name, 0) >= MAX_REQUEUES:
+                    claimed_path.unlink()
+                    abandoned.append(task_name)
+                    print(f'[Debug] Gave up on task {claimed_path.name} after {MAX_REQUEUES} requeues')
+                    continue
+
+                claimed_path.rename(self.todo_dir / task_name)
+                self.n_requeues[task_name] = self.n_requeues.get(task_name, 0) + 1
+                print(f'[Debug] Requeued task {claimed_path.name} after {lease_s}s without a result')
+            except FileNotFoundError:
+                continue
+        return abandoned
+
+    def wait_results(self, task_names: list, lease_s: float):
+        """Yields (task name, result) of every task as the workers finish them, the result is None for the tasks that were given up on."""
+        remaining = set(task_names)
+        while remaining:
+            found = False
+            for done_path in self.done_dir.glob('*.json'):
+                if done_path.stem in remaining:
+                    remaining.discard(done_path.stem)
+                    found = True
+                    yield done_path.stem, json.loads(done_path.read_text())
+            if not found:
+                for task_name in self.requeue_expired(lease_s, remaining):
+                    remaining.discard(task_name)
+                    yield task_name, None
+                time.sleep(POLL_S)
+
+    def finish(self):
+        """Tells the workers that the job is done."""
+        self.finished_path.touch()
+
+    def is_finished(self):
+        return self.finished_path.exists()
+
+    def __write_atomic__(self, path: pathlib.Path, text: str):
+        # Readers on other machines must never see a half-written file
+        temp_path = path.with_name(f'.{path.name}.{socket.gethostname()}.{os.getpid()}.tmp')
+        temp_path.write_text(text)
+        temp_path.replace(path)
+
+
+def run_worker(queue_dir: pathlib.Path, worker_id: str):
+    """Grades the students of the queue in this process until the coordinator finishes the job."""
+    # Imported here as the grader imports this module
+    from grader.grader import Grader
+    from grader.prescreen import screen_submission
+
+    queue = WorkQueue(queue_dir)
+    job = queue.read_job()
+    print(f'[Debug] Worker {worker_id} joined the job in {queue_dir}')
+
+    # Grade in a local copy of the student files, the feedback is sent back with the scores
+    work_dir = pathlib.Path(tempfile.mkdtemp(prefix='grader_worker_'))
+    try:
+        shutil.copytree(queue.students_dir, work_dir, dirs_exist_ok=True)
+        solution_file = queue.solution_dir / job['solution_name']
+        if queue.test_bank_dir.exists():
+            shutil.copytree(queue.test_bank_dir, work_dir / f'{solution_file.stem}_test_bank')
+
+        settings = dict(job['settings'], solution_file=solution_file, student_dir=work_dir, **WORKER_OVERRIDES)
+        grader = Grader(argparse.Namespace(**settings))
+        grader.set_student_files(work_dir / student_name for student_name in job['student_names'])
+
+        n_graded = 0
+        while not queue.is_finished():
+            claimed_path = queue.claim(worker_id)
+            if claimed_path is None:
+                time.sleep(POLL_S)
+                continue
+
+            fpath = work_dir / claimed_path.read_text()
+            grader.screens[str(fpath)] = screen_submission(fpath, grader.sol_code.all_fnames)
+            scores = grader.grade_one_student(fpath)
+            queue.complete(claimed_path, {'worker_id': worker_id, 'scores': scores, 'feedback': grader.feedback_path(fpath).read_text(),
+                                          'records': grader.student_records})
+            n_graded += 1
+
+        print(f'[Debug] Worker {worker_id} graded {n_graded} students')
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_workers(queue_dir: pathlib.Path, n_workers: int):
+    """Runs n_workers worker processes on this machine."""
+    worker_id = f'{socket.gethostname()}-{os.getpid()}'
+    if n_workers <= 1:
+        run_worker(queue_dir, worker_id)
+        return
+
+    processes = [multiprocessing.Process(target=run_worker, args=(queue_dir, f'{worker_id}-{idx}')) for idx in range(n_workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
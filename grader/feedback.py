@@ -1,4 +1,5 @@
 import numpy as np
+from timeit import default_timer as timer
 
 
 def convert_np_dtype_to_regular_type(np_type):
@@ -13,13 +14,34 @@ def convert_np_dtype_to_regular_type(np_type):
         return np_type
 
 
+# Absolute difference allowed between numeric solution and student outputs
+TOLERANCE = 0.001
+
+# Functions that compare solution and student outputs, keyed by the type of the solution output
+COMPARERS = {}
+
+
+def register_comparer(*types):
+    """Registers the decorated function as the comparer of outputs of the given types."""
+    def decorator(func):
+        for t in types:
+            COMPARERS[t] = func
+        return func
+    return decorator
+
+
 def compare_outputs(real_output, student_output):
     """Compares the given outputs and determines if they are equal."""
     # If we expect a 1D array and the student passes a 1D list, convert the student's list to a 1D array
-    expect_1d_array = type(real_output) is np.ndarray and len(real_output.shape) == 1
-    student_has_1d_list = type(student_output) is list and all([not isinstance(item, (list, np.ndarray)) for item in student_output])
-    if expect_1d_array and student_has_1d_list:
-        student_output = np.array(student_output, dtype=real_output.dtype)
+    if type(real_output) is np.ndarray and real_output.ndim == 1 and type(student_output) is list:
+        if len(student_output) != real_output.shape[0]:
+            return False
+        try:
+            student_array = np.array(student_output, dtype=real_output.dtype)
+            if student_array.ndim == 1:
+                student_output = student_array
+        except (ValueError, TypeError):
+            pass
 
     # Convert numpy dtypes to regular types
     real_output = convert_np_dtype_to_regular_type(real_output)
@@ -30,27 +52,70 @@ def compare_outputs(real_output, student_output):
         return False
 
     # Compare the two solutions
-    if type(real_output) is np.ndarray:
-        return np.array_equal(real_output, student_output)
-    elif type(real_output) is bool:
-        return real_output == student_output
-    elif type(real_output) is int or type(real_output) is float or type(real_output) is np.int32 or type(real_output) is np.float32:
-        return abs(real_output - student_output) < 0.001
-    elif type(real_output) is str:
-        return real_output == student_output
-    elif type(real_output) is list:
-        return np.array_equal(real_output, student_output)
-    elif type(real_output) is tuple:
-        L = []
-        for real_item, student_item in zip(real_output, student_output):
-            L.append(compare_outputs(real_item, student_item))
-        return all(L)
-    elif type(real_output) is dict or type(real_output) is set:
-        return real_output == student_output
-    elif real_output is None:
-        return student_output is None
-    else:
+    comparer = COMPARERS.get(type(real_output))
+    if comparer is None:
         raise Exception(f'[Debug] Cannot grade type {type(real_output)}')
+    return comparer(real_output, student_output)
+
+
+@register_comparer(np.ndarray)
+def compare_arrays(real_output, student_output):
+    """Compares arrays with a tolerance when they are numeric, exactly otherwise."""
+    if real_output.shape != student_output.shape:
+        return False
+
+    is_inexact = np.issubdtype(real_output.dtype, np.inexact) or np.issubdtype(student_output.dtype, np.inexact)
+    if is_inexact and np.issubdtype(real_output.dtype, np.number) and np.issubdtype(student_output.dtype, np.number):
+        return bool(np.allclose(real_output, student_output, rtol=0, atol=TOLERANCE, equal_nan=True))
+    return bool(np.array_equal(real_output, student_output))
+
+
+@register_comparer(list)
+def compare_lists(real_output, student_output):
+    """Compares lists as arrays when they can be converted into one, item by item otherwise."""
+    if len(real_output) != len(student_output):
+        return False
+
+    # Exact equality is checked in C and is the common case, so try it first
+    try:
+        if real_output == student_output:
+            return True
+    except ValueError:
+        pass
+
+    try:
+        real_array = np.asarray(real_output)
+        student_array = np.asarray(student_output)
+    except ValueError:
+        real_array = student_array = None
+
+    # Only numeric lists are compared as arrays, converting mixed lists to arrays would turn their items into strings
+    is_numeric = real_array is not None and real_array.dtype.kind in 'biuf' and student_array.dtype.kind in 'biuf'
+    if not is_numeric:
+        return all(compare_outputs(real_item, student_item) for real_item, student_item in zip(real_output, student_output))
+    return compare_arrays(real_array, student_array)
+
+
+@register_comparer(tuple)
+def compare_tuples(real_output, student_output):
+    if len(real_output) != len(student_output):
+        return False
+    return all(compare_outputs(real_item, student_item) for real_item, student_item in zip(real_output, student_output))
+
+
+@register_comparer(int, float)
+def compare_numbers(real_output, student_output):
+    return abs(real_output - student_output) < TOLERANCE
+
+
+@register_comparer(bool, str, dict, set)
+def compare_equal(real_output, student_output):
+    return real_output == student_output
+
+
+@register_comparer(type(None))
+def compare_none(real_output, student_output):
+    return student_output is None
 
 
 def type_to_str(output):
@@ -86,8 +151,77 @@ def output_to_str(output_all):
         return type_to_str(output_all)
 
 
-def diff_to_str(sol_output, stu_output):
+# Limits of diff_to_str() so explaining a failed test case never costs more than running it
+DIFF_MAX_EXAMPLES = 3  # How many mismatched items are shown
+DIFF_MAX_ITEM_CHARS = 100  # How long the string of each shown item can be
+DIFF_MAX_CHARS = 1000  # How long the whole difference string can be
+DIFF_TIME_BUDGET_S = 0.05  # How long we can spend searching for mismatched items that are compared one by one
+
+
+def item_to_str(item):
+    """Converts an item of an output into a short string."""
+    item_str = type_to_str(item)
+    if len(item_str) > DIFF_MAX_ITEM_CHARS:
+        return item_str[:DIFF_MAX_ITEM_CHARS] + '...'
+    return item_str
+
+
+def find_mismatches(sol_output, stu_output, max_examples, deadline):
+    """
+    Finds the items that do not match between two lists, tuples, or arrays of the same length/shape.
+
+    Returns the number of mismatches, up to "max_examples" mismatched indices, and whether all items were compared
+    (when the search runs out of time the number only counts the items compared so far).
+    """
+    # Numeric outputs are compared all at once with NumPy. Check the first item before converting to skip lists that are not numeric
+    is_numeric = False
+    if type(sol_output) is np.ndarray or (len(sol_output) > 0 and isinstance(sol_output[0], (int, float, np.number))):
+        try:
+            sol_array, stu_array = np.asarray(sol_output), np.asarray(stu_output)
+            is_numeric = sol_array.dtype.kind in 'biuf' and stu_array.dtype.kind in 'biuf' and sol_array.shape == stu_array.shape
+        except ValueError:
+            pass
+
+    if is_numeric:
+        mismatches = ~np.isclose(sol_array, stu_array, rtol=0, atol=TOLERANCE, equal_nan=True)
+        n_mismatches = int(np.count_nonzero(mismatches))
+        examples = [tuple(int(i) for i in idx) if len(idx) > 1 else int(idx[0]) for idx in np.argwhere(mismatches)[:max_examples]]
+        return n_mismatches, examples, True
+
+    # Everything else is compared item by item until we run out of time
+    # The clock is checked after every item as a single nested item can take much longer than thousands of flat ones
+    n_mismatches = 0
+    examples = []
+    for idx, (sol_item, stu_item) in enumerate(zip(sol_output, stu_output)):
+        try:
+            is_equal = compare_outputs(sol_item, stu_item)
+        except Exception:
+            is_equal = False
+
+        if not is_equal:
+            n_mismatches += 1
+            if len(examples) < max_examples:
+                examples.append(idx)
+
+        if timer() > deadline:
+            return n_mismatches, examples, idx + 1 == len(sol_output)
+    return n_mismatches, examples, True
+
+
+def diff_to_str(sol_output, stu_output, max_examples=DIFF_MAX_EXAMPLES):
     """Finds out a human readable string specifying what the differences are between the specified outputs."""
+    deadline = timer() + DIFF_TIME_BUDGET_S
+    try:
+        diff_str = __diff_to_str__(sol_output, stu_output, max_examples, deadline)
+    except Exception:
+        # Student outputs can be anything, a difference we fail to explain must not stop the grading
+        return ''
+    if len(diff_str) > DIFF_MAX_CHARS:
+        return diff_str[:DIFF_MAX_CHARS] + '...'
+    return diff_str
+
+
+def __diff_to_str__(sol_output, stu_output, max_examples, deadline):
     if type(sol_output) != type(stu_output):
         if hasattr(sol_output, '__class__'):
             # sol_str = sol_output.__class__.__str__
@@ -96,18 +230,34 @@ def diff_to_str(sol_output, stu_output):
         else:
             return f'Types are different (Solution={type(sol_output)} vs Student={type(stu_output)}'
     elif type(sol_output) is set:
-        return f'Items in solution set but not in student set = {sol_output.difference(stu_output)}, item in student set but not in solution set = {stu_output.difference(sol_output)}'
-    elif type(sol_output) is list:
-        if len(sol_output) != len(stu_output):
-            return f'Lists are not the same length (Solution={len(sol_output)} vs Student={len(stu_output)})'
-
-        # s = 'Difference: '
-        idxs = []
-        for idx, (sol_item, stu_item) in enumerate(zip(sol_output, stu_output)):
-            if sol_item != stu_item:
-                idxs.append(idx)
-                # s += f'(IDX={idx}, Solution={sol_item}, Student={stu_item}), '
-        rand_idx = np.random.choice(idxs)
-        return f'There are [{len(idxs)}] indices that do not match. Let us see a random one -> IDX={rand_idx}, Solution[IDX] = {sol_output[rand_idx]}, Student[IDX] = {stu_output[rand_idx]}'
+        return f'Items in solution set but not in student set = {item_to_str(sol_output.difference(stu_output))}, item in student set but not in solution set = {item_to_str(stu_output.difference(sol_output))}'
+    elif type(sol_output) is dict:
+        missing_keys = [k for k in sol_output.keys() if k not in stu_output]
+        extra_keys = [k for k in stu_output.keys() if k not in sol_output]
+        if missing_keys or extra_keys:
+            return f'Keys in solution dict but not in student dict = {item_to_str(missing_keys[:max_examples])}, keys in student dict but not in solution dict = {item_to_str(extra_keys[:max_examples])}'
+
+        keys = list(sol_output.keys())
+        n_mismatches, examples, is_complete = find_mismatches([sol_output[k] for k in keys], [stu_output[k] for k in keys], max_examples, deadline)
+        examples_str = ', '.join([f'Solution[{keys[idx]!r}] = {item_to_str(sol_output[keys[idx]])}, Student[{keys[idx]!r}] = {item_to_str(stu_output[keys[idx]])}' for idx in examples])
+        return f'There are [{__count_to_str__(n_mismatches, is_complete)}] values that do not match. Let us see some -> {examples_str}'
+    elif type(sol_output) in (list, tuple, np.ndarray):
+        sol_shape = sol_output.shape if type(sol_output) is np.ndarray else len(sol_output)
+        stu_shape = stu_output.shape if type(stu_output) is np.ndarray else len(stu_output)
+        if sol_shape != stu_shape:
+            name = 'Arrays do not have the same shape' if type(sol_output) is np.ndarray else f'{type(sol_output).__name__.capitalize()}s are not the same length'
+            return f'{name} (Solution={sol_shape} vs Student={stu_shape})'
+        if type(sol_output) is np.ndarray and sol_output.ndim == 0:
+            # 0-d arrays have no indices to show
+            return f'Solution = {item_to_str(sol_output.item())}, Student = {item_to_str(stu_output.item())}'
+
+        n_mismatches, examples, is_complete = find_mismatches(sol_output, stu_output, max_examples, deadline)
+        examples_str = ', '.join([f'IDX={idx}, Solution[IDX] = {item_to_str(sol_output[idx])}, Student[IDX] = {item_to_str(stu_output[idx])}' for idx in examples])
+        return f'There are [{__count_to_str__(n_mismatches, is_complete)}] indices that do not match. Let us see some -> {examples_str}'
     else:
         return ''
+
+
+def __count_to_str__(n_mismatches, is_complete):
+    # Only the items compared before running out of time were counted
+    return f'{n_mismatches}' if is_complete else f'at least {n_mismatches}'
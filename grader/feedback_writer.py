@@ -0,0 +1,54 @@
+import pathlib
+
+BYTES_IN_MB = 1e6
+
+
+class FeedbackWriter:
+    """
+    Writes the feedback file of a student, buffering lines in memory and writing them to disk in batches.
+
+    Messages can be strings or functions that return a string. Functions are only called if the message is
+    actually written, so expensive messages cost nothing once the feedback has been truncated.
+    Feedback longer than "mb_max" is truncated with a note at the end instead of stopping the grading.
+    """
+
+    def __init__(self, fpath: pathlib.Path, mb_max: float = 10, buffer_size: int = 64 * 1024):
+        self.file = open(fpath, 'w')
+        self.max_size = mb_max * BYTES_IN_MB
+        self.mb_max = mb_max
+        self.buffer_size = buffer_size
+
+        # Sizes are tracked in memory (in characters) instead of asking the file
+        self.buffer = []
+        self.buffered_size = 0
+        self.written_size = 0
+        self.is_truncated = False
+
+    def write(self, msg):
+        """Writes a message (or the string returned by a message function) as a line of feedback."""
+        if self.is_truncated:
+            return
+
+        if callable(msg):
+            msg = msg()
+        line = f'{msg}\n'
+
+        if self.written_size + self.buffered_size + len(line) > self.max_size:
+            self.is_truncated = True
+            line = f'[AutoGrader] Feedback truncated as it is longer than {self.mb_max}MBs\n'
+
+        self.buffer.append(line)
+        self.buffered_size += len(line)
+        if self.buffered_size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Writes all buffered lines to the file."""
+        self.file.write(''.join(self.buffer))
+        self.written_size += self.buffered_size
+        self.buffer = []
+        self.buffered_size = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
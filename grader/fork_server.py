@@ -0,0 +1,172 @@
+import gc
+import os
+import sys
+import json
+import time
+import signal
+import importlib
+import traceback
+import multiprocessing
+import multiprocessing.connection
+
+# Libraries that student code commonly imports, loaded once before forking so no student pays for importing them
+PRELOAD_MODULES = ['numpy', 'pandas', 'matplotlib', 'matplotlib.pyplot', 'scipy', 'math', 'random', 'collections', 'heapq', 'itertools', 'time']
+
+# How long a child that sent its scores has to exit before it is killed, and how often we check
+CHILD_EXIT_TIMEOUT_S = 5
+CHILD_EXIT_POLL_S = 0.01
+
+
+def preload_libraries():
+    """Imports the libraries of PRELOAD_MODULES that are installed."""
+    for module_name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            continue
+
+
+class ForkServer:
+    """
+    Grades every student in a fresh child process forked from a warm server process.
+
+    The grader process has already imported the libraries, applied the library overrides, and imported the solution,
+    so a child starts grading right away sharing all of that copy-on-write. Student code only ever runs in a child
+    and the child exits after one student, so nothing a student does can leak into the next student.
+
+    Forking a process that runs threads can leave the child waiting forever on a lock held by a thread that does not exist in it
+    (such as the locks of the progress renderer and tqdm), so the children are not forked from the grader process.
+    The server is forked when entering, before the progress renderer starts its threads, and then only ever runs a single thread.
+    The grader sends it the student files through a pipe, and each child sends the scores of its student back to the server,
+    which sends them on to the grader.
+    """
+
+    def __init__(self, grader, n_workers: int):
+        assert hasattr(os, 'fork'), '[Debug] The fork server worker model needs os.fork() which is not available in this platform'
+        self.grader = grader
+        self.n_workers = max(1, n_workers)
+
+    def __enter__(self):
+        preload_libraries()
+
+        self.conn, server_conn = multiprocessing.Pipe()
+        self.server_pid = os.fork()
+        if self.server_pid == 0:
+            # Server process, serve until the grader is done and exit without returning to the caller
+            exit_code = 0
+            try:
+                self.conn.close()
+                self.__serve__(server_conn)
+            except BaseException:
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(exit_code)
+
+        server_conn.close()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Do not wait for the server to grade the students it has left when grading was interrupted
+        if exc_type is not None:
+            os.kill(self.server_pid, signal.SIGKILL)
+        try:
+            self.conn.send(None)
+        except OSError:
+            # The server already exited
+            pass
+        self.conn.close()
+        os.waitpid(self.server_pid, 0)
+
+    def imap_grade(self, fpaths):
+        """Grades the given student files with up to n_workers children at a time, yielding the scores of each file as its child finishes."""
+        remaining = list(fpaths)
+        self.conn.send(remaining)
+        while remaining:
+            try:
+                fpath, scores = self.conn.recv()
+            except EOFError:
+                # The server died, none of the students it had left were graded
+                for fpath in remaining:
+                    yield self.grader.record_failed_student(fpath, f'The fork server stopped unexpectedly')
+                return
+            remaining.remove(fpath)
+            yield scores
+
+    def __serve__(self, conn):
+        # Move everything loaded so far out of the garbage collector so collections in the children do not copy those pages
+        gc.collect()
+        gc.freeze()
+
+        while True:
+            try:
+                fpaths = conn.recv()
+            except EOFError:
+                return
+            if fpaths is None:
+                return
+            for fpath, scores in self.__grade_children__(fpaths):
+                conn.send((fpath, scores))
+
+    def __grade_children__(self, fpaths):
+        """Grades the given student files with up to n_workers children at a time, yielding each file and its scores as its child finishes."""
+        to_grade = list(fpaths)
+        running = {}
+        while to_grade or running:
+            while to_grade and len(running) < self.n_workers:
+                fpath = to_grade.pop(0)
+                reader, writer = multiprocessing.Pipe(duplex=False)
+                pid = self.__fork_child__(fpath, reader, writer)
+
+                # Only the child writes, closing our end lets us see the end of the pipe when the child dies
+                writer.close()
+                running[reader] = (pid, fpath)
+
+            for reader in multiprocessing.connection.wait(list(running.keys())):
+                pid, fpath = running.pop(reader)
+                try:
+                    scores = json.loads(reader.recv())
+                except EOFError:
+                    scores = None
+                reader.close()
+                status = self.__wait_child__(pid)
+
+                # The child died before sending the scores (killed for using too much memory, crashed the interpreter...)
+                if scores is None:
+                    scores = self.grader.record_failed_student(fpath, f'The grading process stopped unexpectedly with exit code {os.waitstatus_to_exitcode(status)}')
+                yield fpath, scores
+
+    def __wait_child__(self, pid):
+        """Waits for a child to exit and returns its wait status, killing it if it is still running after CHILD_EXIT_TIMEOUT_S."""
+        # A child can hang after sending its scores, in a thread the student started or an exit handler
+        deadline = time.monotonic() + CHILD_EXIT_TIMEOUT_S
+        while time.monotonic() < deadline:
+            waited_pid, status = os.waitpid(pid, os.WNOHANG)
+            if waited_pid != 0:
+                return status
+            time.sleep(CHILD_EXIT_POLL_S)
+
+        print(f'[Debug] Killing grading process {pid} as it did not exit {CHILD_EXIT_TIMEOUT_S}s after grading')
+        os.kill(pid, signal.SIGKILL)
+        return os.waitpid(pid, 0)[1]
+
+    def __fork_child__(self, fpath, reader, writer):
+        pid = os.fork()
+        if pid != 0:
+            return pid
+
+        # Child process, grade the student and exit without returning to the caller
+        exit_code = 0
+        try:
+            reader.close()
+            scores = self.grader.grade_one_student(fpath)
+            writer.send(json.dumps(scores, default=str))
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)
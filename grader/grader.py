@@ -1,10 +1,10 @@
+import os
 import sys
 import pathlib
-import subprocess
-import multiprocessing
 import warnings
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
 
-import pandas as pd
 import numpy as np
 from tqdm import tqdm
 from timeit import default_timer as timer
@@ -13,20 +13,69 @@ from timeit import default_timer as timer
 from grader.student_code import StudentCode
 from grader.solution_code import SolutionCode
 from grader.test_cases import TestCaseGenerator
+from grader.test_bank import TestBank
+from grader.worker_pool import WorkerPool
+from grader.fork_server import ForkServer
+from grader.timeouts import create_timeout_engine
+from grader.results_cache import ResultsCache
+from grader.notebooks import convert_notebook
+from grader.journal import GradingJournal
+from grader.stopping import EarlyStopping
+from grader.complexity import ComplexityTest
+from grader.memory import reset_peak_rss, peak_rss_mb, current_rss_mb
+from grader.prescreen import screen_all_submissions
+from grader.distributed import WorkQueue, MAX_REQUEUES
+from grader.profiling import build_profile_report, write_profile_report
 from grader.utils import Colors
+from grader.import_hooks import ModulePatcher
+from grader.progress import ProgressRenderer, ProgressReporter
+from grader.attempts import AttemptIndex
 
 
 class Grader:
     def __init__(self, args):
+        self.args = args
         self.solution_file = args.solution_file
         self.student_dir = args.student_dir
         self.max_grade = args.max_grade
         self.students = args.students
         self.multiprocessing_cores = args.multiprocessing
+        self.cache_solution = args.cache_solution
+        self.seed = args.seed
+        self.chunksize = args.chunksize
+        self.max_tasks_per_child = args.max_tasks_per_child
+        self.worker_model = args.worker_model
+        self.timeout_engine = create_timeout_engine(args.timeout_engine, args.timeout_s, args.timeout_budget_s)
+        self.incremental = args.incremental
+        self.resume = args.resume
+        self.latest_only = args.latest_only
+        self.profile = args.profile
+        self.memory_limit_mb = args.memory_limit_mb
+        self.import_timeout_s = args.import_timeout_s
+
+        # Students are graded by workers on other machines when a queue directory is given (see grader/distributed.py)
+        self.queue_dir = args.queue_dir
+        self.lease_s = args.lease_s
+
+        # Memory and profile records journaled for the last graded student, distributed workers send them to the coordinator
+        self.student_records = []
+
+        # Results of pre-screening the submissions, keyed by path (see grade_all_students())
+        self.screens = {}
+
+        # Student files being graded and their Blackboard attempts (see set_student_files())
+        self.all_student_files = set()
+        self.attempt_index = AttemptIndex([])
+
+        # Queue of the progress renderer while grading, inherited by the worker processes (see grade_files())
+        self.progress_queue = None
 
         # This is where the summary excel file will be saved
         self.summary_path = pathlib.Path(self.student_dir / f'{self.solution_file.stem}_summary.xlsx')
 
+        # Results are journaled as they are graded so an interrupted run can be resumed
+        self.journal = GradingJournal(self.student_dir / f'{self.solution_file.stem}_journal.jsonl', self.resume)
+
         # Add directories to the path so we can import the modules more easily later
         # and for the student's code to find files with open() as well
         sys.path.append(str(self.student_dir.resolve()))
@@ -42,8 +91,36 @@ class Grader:
 
         # Override libraries and then import solution
         self.override_libraries()
+        self.load_solution()
+
+    def load_solution(self):
+        """Imports the solution and prepares everything that depends on it. Called again to reload the solution when it changes."""
+        # Forget the previously imported solution module so a changed solution file is imported again
+        sys.modules.pop(self.solution_file.stem, None)
         self.sol_code = SolutionCode(self.solution_file)
 
+        # Generate the parameters of all test cases once from the given seed so all students get the same cases
+        if self.seed is not None:
+            test_bank = TestBank(self.student_dir / f'{self.solution_file.stem}_test_bank', self.seed)
+            test_bank.build(self.sol_code, self.solution_file)
+            self.sol_code.load_test_bank(test_bank)
+
+        # Run the solution once per test case ahead of time instead of once per test case per student
+        if self.cache_solution:
+            self.sol_code.precompute_test_cases()
+
+        # Time the solution on the inputs of its complexity tests once so all students are compared against the same timings
+        for fn_name, sol_fn in self.sol_code:
+            if hasattr(sol_fn, 'complexity'):
+                self.sol_code.measure_complexity(fn_name)
+
+        # Reuse the results of submissions that have not changed since they were last graded
+        self.results_cache = None
+        if self.incremental:
+            settings = {'seed': self.seed, 'max_grade': self.max_grade, 'timeout_engine': self.args.timeout_engine, 'timeout_s': self.args.timeout_s,
+                        'timeout_budget_s': self.args.timeout_budget_s, 'memory_limit_mb': self.memory_limit_mb, 'import_timeout_s': self.import_timeout_s}
+            self.results_cache = ResultsCache(self.student_dir / '.grader_cache', self.solution_file, settings)
+
     def override_libraries(self):
         """
         Override some library functions that we don't want to run in the grader.
@@ -52,11 +129,13 @@ class Grader:
         You can also use this to provide a fake/dummy module that the student code will use,
             a good example of such a case is to provide a google.colab module locally.
         """
-        import matplotlib.pyplot
         import grader.empty_module
 
-        matplotlib.pyplot.show = lambda: None
-        sys.modules['matplotlib.pyplot'].show = lambda: None
+        # Importing matplotlib is slow so only patch it once something imports it
+        def override_pyplot(pyplot):
+            pyplot.show = lambda *args, **kwargs: None
+        ModulePatcher('matplotlib.pyplot', override_pyplot).install()
+
         sys.modules['google.colab'] = grader.empty_module
 
     def convert_all_student_jupyter_to_py(self):
@@ -65,46 +144,44 @@ class Grader:
         if len(all_jupyter_fpaths) == 0:
             return
 
-        # Create a directory to place the notebooks after conversion
-        if not self.notebook_dir.exists():
-            self.notebook_dir.mkdir()
-
         print(f'[Debug] Converting {len(all_jupyter_fpaths)} Jupyter notebooks')
         start_time = timer()
-        if self.multiprocessing_cores <= 1:
-            for fpath in tqdm(all_jupyter_fpaths):
-                self.convert_one_student_jupyter_to_py(fpath)
-        else:
-            with multiprocessing.Pool(self.multiprocessing_cores) as pool:
-                pool.map(self.convert_one_student_jupyter_to_py, all_jupyter_fpaths)
+        # Conversion happens in-process and is mostly file reading/writing so threads are enough
+        with ThreadPoolExecutor(max(1, self.multiprocessing_cores)) as executor:
+            for _ in tqdm(executor.map(self.convert_one_student_jupyter_to_py, all_jupyter_fpaths), total=len(all_jupyter_fpaths)):
+                pass
         print(f'[Debug] Converting Jupyter notebooks took {timer()-start_time:.2f}sec')
 
     def convert_one_student_jupyter_to_py(self, fpath):
         """Converts a given notebook into a Python script if needed."""
+        # Create a directory to place the notebooks after conversion, here as notebooks can also arrive while watching
+        self.notebook_dir.mkdir(exist_ok=True)
+
         # If the file has already been converted skip it (don't convert it again!)
         if fpath.with_suffix(".py").exists():
             fpath.rename(self.notebook_dir / fpath.name)
             return
 
-        print(f"[Auto-Grader] Converting jupyter notebook {fpath.stem} into regular code")
-        subprocess.call(['jupyter', 'nbconvert', '--to', 'python', str(fpath)])
+        # Notebooks that cannot be read are left in place so they can be fixed by hand
+        try:
+            convert_notebook(fpath)
+        except Exception as ex:
+            print(f'[Auto-Grader] Could not convert jupyter notebook {fpath.stem} due to exception {ex}')
+            return
         fpath.rename(self.notebook_dir / fpath.name)
 
-    def grade_all_students(self):
-        """Grades all students in the given student directory"""
+    def find_student_files(self):
+        """Finds the student code files in the student directory, only those of the given --students if any."""
         # Find all the student code files
         stu_files = list(self.student_dir.glob("*.py"))
 
         # If the --student parameter is passed in the command-line, grade only those students
         if self.students:
+            stu_attempts = AttemptIndex(stu_files)
             temp_student_files = []
             for student_name in self.students:
                 # Look for all Blackboard attempts
-                attempts = []
-                for att_path in stu_files:
-                    att_path_split = att_path.stem.split('_')
-                    if len(att_path_split) >= 4 and att_path_split[1] == student_name:
-                        attempts.append(att_path)
+                attempts = stu_attempts.student_attempts(student_name)
 
                 # If we find Blackboard attempts, grade those
                 # If not, try to open the parameter as a file with
@@ -117,104 +194,338 @@ class Grader:
 
             stu_files = temp_student_files
 
-        self.all_student_files = set(stu_files)
+        all_student_files = set(stu_files)
         discard = set(['bst', 'btree', 'graph', 'dsf', 'min_heap'])
-        for fpath in list(self.all_student_files):
+        for fpath in list(all_student_files):
             if fpath.stem in discard:
-                self.all_student_files.discard(fpath)
+                all_student_files.discard(fpath)
+        return all_student_files
+
+    def set_student_files(self, student_files):
+        """Sets the student files being graded and indexes their Blackboard attempts once for numbering them."""
+        self.all_student_files = set(student_files)
+        self.attempt_index = AttemptIndex(self.all_student_files)
+
+    def grade_all_students(self):
+        """Grades all students in the given student directory"""
+        self.set_student_files(self.find_student_files())
+
+        # Skip the students that were graded by a previous run that did not finish
+        to_grade_files = list(self.all_student_files)
+        if self.resume:
+            finished_fpaths = self.journal.student_scores().keys()
+            to_grade_files = [fpath for fpath in to_grade_files if str(fpath) not in finished_fpaths]
+            print(f'[Debug] Resuming, {len(self.all_student_files) - len(to_grade_files)} students were already graded')
+
+        self.grade_files(to_grade_files)
+        self.write_summary()
+        self.report_worker_memory(to_grade_files)
+
+        # Create the profiling report of the students graded in this run
+        if self.profile:
+            graded_fpaths = set(str(fpath) for fpath in to_grade_files)
+            profile_records = [record for record in self.journal.read() if record['type'] == 'profile' and record['fpath'] in graded_fpaths]
+            report = build_profile_report(profile_records)
+            write_profile_report(report, self.student_dir / f'{self.solution_file.stem}_profile.json')
+
+    def grade_files(self, to_grade_files: list):
+        """Grades the given student files, writing the scores of each student to the journal as soon as they finish."""
+        # Only the most recent attempt of each student is graded with --latest_only
+        if self.latest_only:
+            to_grade_files = self.skip_superseded_attempts(to_grade_files)
+
+        # Restore the results of unchanged submissions and only grade the rest
+        if self.results_cache:
+            changed_files = []
+            for fpath in to_grade_files:
+                stu_scores = self.restore_one_student(fpath)
+                if stu_scores:
+                    self.journal.write_student(fpath, stu_scores)
+                else:
+                    changed_files.append(fpath)
+            print(f'[Debug] Reusing the results of {len(to_grade_files) - len(changed_files)} unchanged submissions, grading {len(changed_files)}')
+            to_grade_files = changed_files
+
+        # Compile all submissions before grading. Submissions with syntax errors are rejected right here
+        # without importing them instead of taking up a worker
+        self.screens = screen_all_submissions(to_grade_files, self.sol_code.all_fnames, self.multiprocessing_cores)
+        rejected_files = [fpath for fpath in to_grade_files if self.screens[str(fpath)]['syntax_error']]
+        compiled_files = [fpath for fpath in to_grade_files if not self.screens[str(fpath)]['syntax_error']]
 
         # Grade all students, suppressing their code warnings for cleaner output
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-
-            all_scores = []
-            if self.multiprocessing_cores <= 1:
-                for fpath in self.all_student_files:
-                    print('[Debug] Grading', fpath)
-                    stu_scores = self.grade_one_student(fpath)
-                    all_scores.append(stu_scores)
-            else:
-                with multiprocessing.Pool(self.multiprocessing_cores) as pool:
-                    all_scores = pool.map(self.grade_one_student, self.all_student_files)
-
-        # Create summary file
+        # The scores of each student are written to the journal as soon as they finish
+        # Workers send their progress through the queue of a single renderer so only this process draws it
+        progress = ProgressRenderer(len(to_grade_files))
+        self.progress_queue = progress.queue
+
+        # The fork server forks its process before the renderer starts its threads (see grader/fork_server.py)
+        use_fork_server = self.worker_model == 'forkserver' and not self.queue_dir and compiled_files
+        server = ForkServer(self, self.multiprocessing_cores) if use_fork_server else contextlib.nullcontext()
+
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                with server, progress:
+                    for fpath in rejected_files:
+                        self.grade_one_student(fpath)
+
+                    if self.queue_dir:
+                        self.grade_distributed(compiled_files)
+                    elif use_fork_server:
+                        for _ in server.imap_grade(compiled_files):
+                            pass
+                    elif self.multiprocessing_cores <= 1 or len(compiled_files) <= 1:
+                        for fpath in compiled_files:
+                            self.grade_one_student(fpath)
+                    else:
+                        with WorkerPool(self, self.multiprocessing_cores, self.chunksize, self.max_tasks_per_child) as pool:
+                            for _ in pool.imap_grade(compiled_files):
+                                pass
+        finally:
+            self.progress_queue = None
+
+    def write_summary(self):
+        """Creates the summary file with the latest scores of every student from the journal."""
+        # Only needed for the summary, importing it here keeps the command-line startup and the workers fast
+        import pandas as pd
+
+        journal_scores = self.journal.student_scores()
+        journal_peaks = self.journal.student_peak_memory()
+        all_scores = []
+        for fpath in self.all_student_files:
+            if str(fpath) in journal_scores:
+                peak_columns = {f'{fn_name}_peak_mb': peak_mb for fn_name, peak_mb in journal_peaks.get(str(fpath), {}).items()}
+                all_scores.append(dict(journal_scores[str(fpath)], **peak_columns))
         self.df = pd.DataFrame.from_records(all_scores)
         self.df = self.df.sort_values('student')
         print("Creating summary file with scores per problem")
         print(self.df)
         self.df.to_excel(self.summary_path, index=False)
 
-    def grade_one_student(self, fpath: pathlib.Path):
-        """Grades all functions of a given student."""
+    def report_worker_memory(self, graded_fpaths):
+        """Prints the memory of each worker process before its first student and after its last student of this run."""
+        graded_fpaths = set(str(fpath) for fpath in graded_fpaths)
+        workers = {}
+        for record in self.journal.read():
+            if record['type'] == 'memory' and record['fpath'] in graded_fpaths and record['rss_before_mb'] is not None:
+                workers.setdefault(record['pid'], []).append(record)
+
+        # Every student gets its own process with the fork server so summarize all of them at once
+        if self.worker_model == 'forkserver' and workers:
+            records = [record for pid_records in workers.values() for record in pid_records]
+            print(f'[Debug] {len(records)} forked processes started grading at {np.mean([record["rss_before_mb"] for record in records]):.1f}MB on average '
+                  f'and finished at {np.mean([record["rss_after_mb"] for record in records]):.1f}MB on average')
+            return
 
-        with StudentCode(self.student_dir, fpath, self.all_student_files) as stu_code:
-            # Open a progress bar for visualization in the command-line
-            stu_code.log(f'Importing module')
-            stu_code.p_bar.total = 100
-
-            # We will keep track of all problem grades in this dictionary
-            scores = {fn_name: 0 for fn_name in self.sol_code.all_fnames}
-            scores['student'] = stu_code.student_name
-            scores['final_grade'] = 0
-
-            # We will keep track of the total score from all problems in this int
-            total_score = 0
-
-            # Try to import the student's code
-            import_exception = stu_code.import_module()
-            scores['import_exception'] = import_exception
-            if import_exception:
-                stu_code.log(f'{Colors.T_MAGENTA}Import exception [{import_exception}]{Colors.T_RESET}')
-                return scores
-
-            # Go through all functions in the solution
-            for idx, (fn_name, _) in enumerate(self.sol_code):
-                # stu_code.p_bar.update()
-                stu_code.log(f'Grading [{idx+1}/{len(self.sol_code)}], fn="{fn_name}"')
-                stu_code.write_feedback(f'******************** [AutoGrader] Grading fn="{fn_name}" ********************')
-
-                # Check if the student actually has the function
-                if not stu_code.has_fn(fn_name):
-                    stu_code.write_feedback(f'Did not find {fn_name} in the student code, assigning a grade of 0 to this problem')
-                    scores[fn_name] = 0
-                    continue
+        for pid, records in workers.items():
+            print(f'[Debug] Worker {pid} graded {len(records)} students, memory went from {records[0]["rss_before_mb"]:.1f}MB '
+                  f'to {records[-1]["rss_after_mb"]:.1f}MB (largest {max(record["rss_after_mb"] for record in records):.1f}MB)')
 
-                # Grade the function
-                scores[fn_name] = self.grade_one_function(fn_name, stu_code)
-                total_score += scores[fn_name]
+    def grade_distributed(self, fpaths: list):
+        """Publishes the given students to the work queue and waits for the workers to send back their scores and feedback."""
+        queue = WorkQueue(self.queue_dir)
+        test_bank_dir = self.student_dir / f'{self.solution_file.stem}_test_bank' if self.seed is not None else None
 
-            # Summarize scores
-            stu_code.write_feedback(f'\n ** Summary of all problem scores = \n\n \t{scores}\n')
+        # Workers also need the files that are not graded (helper modules, other attempts) to import and name the students
+        student_files = set(self.student_dir.glob('*.py')) | set(self.all_student_files)
+        assert len(set(fpath.name for fpath in student_files)) == len(student_files), '[Debug] Student files must have unique names to be graded distributed'
 
-            # Compute final score out as an integer between 0 and 1
-            final_score = total_score / (len(self.sol_code) - self.sol_code.num_extra_credit())
-            color = Colors.T_RED if final_score < 0.7 else Colors.T_YELLOW if final_score < 0.8 else Colors.T_DARK_GREEN if final_score < 0.9 else Colors.T_GREEN
+        task_names = queue.publish(vars(self.args), self.solution_file, test_bank_dir, sorted(student_files), fpaths)
+        print(f'[Debug] Published {len(fpaths)} students to {self.queue_dir}, waiting for workers')
+
+        # Tell the workers to stop even if the coordinator is interrupted, otherwise they would wait for tasks forever
+        try:
+            for task_name, result in queue.wait_results(list(task_names.keys()), self.lease_s):
+                fpath = task_names[task_name]
+                if result is None:
+                    self.record_failed_student(fpath, f'Grading did not finish on any worker after {MAX_REQUEUES} retries')
+                    continue
 
-            # Convert the final score to the scale passed by the user
-            final_score = final_score * self.max_grade
-            scores['final_grade'] = final_score
+                # Memory and profile records of the worker refer to its own copy of the student file and its own processes
+                for record in result['records']:
+                    record['fpath'] = str(fpath)
+                    if 'pid' in record:
+                        record['pid'] = result['worker_id']
+                    self.journal.append(record)
+
+                scores = result['scores']
+                self.feedback_path(fpath).write_text(result['feedback'])
+                if self.results_cache:
+                    fn_peak_mb = next(record['fn_peak_mb'] for record in result['records'] if record['type'] == 'memory')
+                    self.results_cache.put(fpath, scores, result['feedback'], fn_peak_mb)
+                self.journal.write_student(fpath, scores)
+                ProgressReporter(self.progress_queue, scores['student']).finish(f'Final grade = {scores["final_grade"]:.2f}/{self.max_grade} (worker {result["worker_id"]})')
+        finally:
+            queue.finish()
+
+    def record_failed_student(self, fpath: pathlib.Path, reason: str):
+        """Gives a grade of 0 to a student whose grading could not finish and lets them know why."""
+        stu_code = StudentCode(self.student_dir, fpath, self.attempt_index, self.timeout_engine)
+        scores = {fn_name: 0 for fn_name in self.sol_code.all_fnames}
+        scores['student'] = stu_code.student_name
+        scores['final_grade'] = 0
+        scores['import_exception'] = reason
+        with open(stu_code.feedback_path, 'a') as file:
+            file.write(f'\n[AutoGrader] {reason}, assigning a grade of 0\n')
+        self.journal.write_student(fpath, scores)
+
+        # The student may have started grading in a process that died, let the renderer know it finished
+        ProgressReporter(self.progress_queue, stu_code.student_name).finish(f'{Colors.T_MAGENTA}{reason}{Colors.T_RESET}')
+        return scores
+
+    def skip_superseded_attempts(self, fpaths: list):
+        """Marks the older attempts of the students of the given files as superseded and returns the latest attempts to grade."""
+        latest_files = [fpath for fpath in fpaths if self.attempt_index.latest_attempt(fpath) == fpath]
+        superseded_files = set(old_fpath for fpath in fpaths for old_fpath in self.attempt_index.older_attempts(fpath))
+        for fpath in superseded_files:
+            self.mark_superseded(fpath)
+        print(f'[Debug] Grading only the latest attempts, {len(superseded_files)} older attempts were superseded')
+        return latest_files
+
+    def mark_superseded(self, fpath: pathlib.Path):
+        """Lets the student know that this attempt was not graded as they submitted a newer one, and journals it without a grade."""
+        stu_code = StudentCode(self.student_dir, fpath, self.attempt_index, self.timeout_engine)
+        latest_code = StudentCode(self.student_dir, self.attempt_index.latest_attempt(fpath), self.attempt_index, self.timeout_engine)
+        stu_code.feedback_path.write_text(f'[AutoGrader] This attempt was superseded by your newer attempt {latest_code.student_name} and was not graded\n')
+
+        scores = {'student': stu_code.student_name, 'final_grade': None, 'import_exception': None, 'superseded_by': latest_code.student_name}
+        self.journal.write_student(fpath, scores)
+
+    def feedback_path(self, fpath: pathlib.Path):
+        """Gets the path of the feedback file of a student."""
+        return StudentCode(self.student_dir, fpath, self.attempt_index, self.timeout_engine).feedback_path
+
+    def restore_one_student(self, fpath: pathlib.Path):
+        """Restores the scores and feedback file of a student from the results cache. Returns None if the student has to be graded."""
+        cached = self.results_cache.get(fpath)
+        if cached is None:
+            return None
+
+        # Attempt numbers depend on the other submissions so recompute the name and feedback file
+        scores, feedback, fn_peak_mb = cached
+        stu_code = StudentCode(self.student_dir, fpath, self.attempt_index, self.timeout_engine)
+        stu_code.feedback_path.write_text(feedback)
+        scores['student'] = stu_code.student_name
+
+        # Journal the peak memory measured when the submission was graded for the summary, no process memory was used now
+        self.journal.append({'type': 'memory', 'fpath': str(fpath), 'pid': os.getpid(), 'rss_before_mb': None, 'rss_after_mb': None, 'fn_peak_mb': fn_peak_mb})
+        return scores
 
-            # Log final scores
-            stu_code.write_feedback(f'Final grade = {final_score:.2f}/{self.max_grade}')
-            stu_code.log(f'Final grade = {color}{final_score:.2f}/{self.max_grade}{Colors.T_RESET}')
+    def grade_one_student(self, fpath: pathlib.Path):
+        """Grades all functions of a given student."""
+        rss_before_mb = current_rss_mb()
+        start_t = timer()
+        with StudentCode(self.student_dir, fpath, self.attempt_index, self.timeout_engine, self.memory_limit_mb, self.import_timeout_s, self.progress_queue) as stu_code:
+            scores = self.grade_student_code(stu_code)
+
+        # Journal the memory of this process so growth across students shows up in the worker memory report
+        # The peak memory of each function is journaled here instead of in the scores, which are shown to the student
+        self.student_records = [{'type': 'memory', 'fpath': str(fpath), 'pid': os.getpid(), 'rss_before_mb': rss_before_mb, 'rss_after_mb': current_rss_mb(),
+                                 'fn_peak_mb': stu_code.fn_peak_mb}]
+
+        # Journal where the time went for the profiling report
+        if self.profile:
+            self.student_records.append({'type': 'profile', 'fpath': str(fpath), 'student': stu_code.student_name,
+                                         'total_sec': timer() - start_t, 'phases': stu_code.profiler.phase_totals(), 'functions': stu_code.profiler.fn_phases})
+        for record in self.student_records:
+            self.journal.append(record)
+
+        # Store the results so this submission is not graded again until it or the solution changes
+        if self.results_cache:
+            self.results_cache.put(fpath, scores, stu_code.feedback_path.read_text(), stu_code.fn_peak_mb)
+
+        self.journal.write_student(fpath, scores)
+        return scores
+
+    def grade_student_code(self, stu_code: StudentCode):
+        """Imports the student code and grades all of its functions."""
+        stu_code.log(f'Importing module')
+
+        # We will keep track of all problem grades in this dictionary
+        scores = {fn_name: 0 for fn_name in self.sol_code.all_fnames}
+        scores['student'] = stu_code.student_name
+        scores['final_grade'] = 0
+
+        # We will keep track of the total score from all problems in this int
+        total_score = 0
+
+        # Submissions that do not compile are not imported, and the others get notes about what the pre-screen found
+        screen = self.screens.get(str(stu_code.fpath))
+        if screen and screen['syntax_error']:
+            stu_code.write_feedback(f'[AutoGrader] Could not compile module due to {screen["syntax_error"]}')
+            stu_code.log(f'{Colors.T_MAGENTA}Syntax error [{screen["syntax_error"]}]{Colors.T_RESET}')
+            scores['import_exception'] = screen['syntax_error']
             return scores
+        if screen and screen['expensive_lines']:
+            stu_code.write_feedback(f'Note: The loops or function calls at lines {screen["expensive_lines"]} run every time your file is imported. '
+                                    f'Move testing code inside "if __name__ == \'__main__\':" so it does not run while grading')
+        if screen and screen['missing_fns']:
+            stu_code.write_feedback(f'Note: Did not find the functions {screen["missing_fns"]} in your file')
+
+        # Try to import the student's code
+        start_t = timer()
+        import_exception = stu_code.import_module()
+        stu_code.profiler.lap('<module>', 'import', start_t)
+        scores['import_exception'] = import_exception
+        if import_exception:
+            stu_code.log(f'{Colors.T_MAGENTA}Import exception [{import_exception}]{Colors.T_RESET}')
+            return scores
+
+        # Go through all functions in the solution
+        for idx, (fn_name, _) in enumerate(self.sol_code):
+            stu_code.log(f'Grading [{idx+1}/{len(self.sol_code)}], fn="{fn_name}"')
+            stu_code.write_feedback(f'******************** [AutoGrader] Grading fn="{fn_name}" ********************')
+
+            # Check if the student actually has the function
+            if not stu_code.has_fn(fn_name):
+                stu_code.write_feedback(f'Did not find {fn_name} in the student code, assigning a grade of 0 to this problem')
+                scores[fn_name] = 0
+                continue
+
+            # Grade the function, recording the peak memory it used on top of what the process already had
+            reset_peak_rss()
+            start_mb = peak_rss_mb()
+            scores[fn_name] = self.grade_one_function(fn_name, stu_code)
+            stu_code.fn_peak_mb[fn_name] = peak_rss_mb() - start_mb
+            total_score += scores[fn_name]
+            self.journal.write_function(stu_code.fpath, stu_code.student_name, fn_name, scores[fn_name])
+
+        # Summarize scores
+        stu_code.write_feedback(f'\n ** Summary of all problem scores = \n\n \t{scores}\n')
+
+        # Compute final score out as an integer between 0 and 1
+        final_score = total_score / (len(self.sol_code) - self.sol_code.num_extra_credit())
+        color = Colors.T_RED if final_score < 0.7 else Colors.T_YELLOW if final_score < 0.8 else Colors.T_DARK_GREEN if final_score < 0.9 else Colors.T_GREEN
+
+        # Convert the final score to the scale passed by the user
+        final_score = final_score * self.max_grade
+        scores['final_grade'] = final_score
+
+        # Log final scores
+        stu_code.write_feedback(f'Final grade = {final_score:.2f}/{self.max_grade}')
+        stu_code.log(f'Final grade = {color}{final_score:.2f}/{self.max_grade}{Colors.T_RESET}')
+        return scores
 
     def grade_one_function(self, fn_name: str, stu_code: StudentCode):
         """Runs all test cases and grades the provided function for one specific student."""
         # Create a generator of test cases
         gen = TestCaseGenerator(fn_name, self.sol_code, stu_code)
 
-        # Extend progress bar and keep track of test case results
-        stu_code.p_bar.total = len(gen)
-        stu_code.p_bar.n = 0
+        # Keep track of test case results
         test_case_results = []
 
         # TODO: Move to command-line?
         # How many exceptions we will allow before stopping the trials
         n_exception_patience = 5
 
+        # Functions annotated with @adaptive_trials stop once the score is known well enough
+        sol_fn = self.sol_code.solution_fns[fn_name]
+        early_stopping = EarlyStopping(**sol_fn.adaptive_trials) if hasattr(sol_fn, 'adaptive_trials') else None
+        is_stopped_early = False
+        n_passed_so_far = 0
+
         for trial_idx in range(len(gen)):
-            stu_code.log_progress(trial_idx, len(gen))
+            stu_code.progress.n_trials += 1
             has_passed_test = gen[trial_idx]
 
             # Catch student exceptions first
@@ -231,11 +542,30 @@ class Grader:
                     continue
             # No exceptions so add pass/fail result to the total list
             test_case_results.append(has_passed_test)
+            n_passed_so_far += bool(has_passed_test)
+
+            if early_stopping and early_stopping.should_stop(n_passed_so_far, len(test_case_results)):
+                is_stopped_early = len(test_case_results) < len(gen)
+                break
 
         # Once all trials are completed, we compute the score between 0 and 1
+        # When stopping early the score is the pass rate of the test cases that were run
         n_passed_cases = np.sum(test_case_results)
-        total_score = n_passed_cases / len(gen)
-
-        stu_code.write_feedback(f'###>>> Passed {n_passed_cases}/{len(gen)} test cases')
+        n_cases = len(test_case_results) if is_stopped_early else len(gen)
+        total_score = n_passed_cases / n_cases
+
+        if is_stopped_early:
+            half_width = early_stopping.half_width(n_passed_cases, n_cases)
+            stu_code.write_feedback(f'###>>> Stopped after {n_cases}/{len(gen)} test cases as the pass rate is known to be {total_score:.3f} +/- {half_width:.3f} with {early_stopping.confidence*100:.0f}% confidence')
+        stu_code.write_feedback(f'###>>> Passed {n_passed_cases}/{n_cases} test cases')
+
+        # Functions annotated with @complexity_test also get graded on how their running time grows with the input size
+        # Timing a function that fails every test case tells us nothing so it gets no complexity credit
+        if hasattr(sol_fn, 'complexity'):
+            start_t = timer()
+            complexity_score = ComplexityTest(fn_name, self.sol_code, stu_code).grade() if n_passed_cases > 0 else 0
+            stu_code.profiler.lap(fn_name, 'complexity', start_t)
+            weight = sol_fn.complexity['weight']
+            total_score = (1 - weight) * total_score + weight * complexity_score
         stu_code.write_feedback(f'###>>> Grade for function "{fn_name}" = {total_score*100:.0f} / 100\n')
         return total_score
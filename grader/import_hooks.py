@@ -0,0 +1,40 @@
+import sys
+import importlib.abc
+import importlib.util
+
+
+class ModulePatcher(importlib.abc.MetaPathFinder):
+    """
+    Patches a module right after it is imported, so the module is only imported if something (usually student code) uses it.
+
+    If the module was already imported it is patched right away.
+    """
+
+    def __init__(self, module_name: str, patch_fn):
+        self.module_name = module_name
+        self.patch_fn = patch_fn
+
+    def install(self):
+        if self.module_name in sys.modules:
+            self.patch_fn(sys.modules[self.module_name])
+        elif self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != self.module_name:
+            return None
+
+        # Let the other finders find the real module, the patch only has to be applied once
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(fullname)
+        if spec is None or spec.loader is None:
+            return spec
+
+        exec_module = spec.loader.exec_module
+
+        def exec_and_patch(module):
+            exec_module(module)
+            self.patch_fn(module)
+
+        spec.loader.exec_module = exec_and_patch
+        return spec
@@ -0,0 +1,74 @@
+import copy
+
+import numpy as np
+
+# Values of these types cannot be modified so they can be shared without copying (np.generic are NumPy scalars)
+IMMUTABLE_TYPES = (type(None), bool, int, float, complex, str, bytes, range, np.generic)
+FLAT_ITEM_TYPES = {type(None), bool, int, float, complex, str, bytes} | (set(np.sctypeDict.values()) - {np.object_, np.void})
+
+# Give students read-only views of arrays instead of copies. Students that modify their input arrays will get an exception
+READ_ONLY_ARRAYS = False
+
+
+def is_immutable(value):
+    """Determines if a value (or tuple/frozenset of values) cannot be modified."""
+    if isinstance(value, IMMUTABLE_TYPES):
+        return True
+    if type(value) in (tuple, frozenset):
+        return all(is_immutable(item) for item in value)
+    return False
+
+
+def has_flat_items(values):
+    """Determines if all the given values are immutable Python scalars. Checks the types in C instead of looping in Python."""
+    return set(map(type, values)) <= FLAT_ITEM_TYPES
+
+
+def isolate(value):
+    """
+    Gets a version of the value that student code can use (and modify) without affecting the original.
+
+    Uses the cheapest safe strategy for the type of the value:
+        immutable values are shared, arrays get a flat copy (or a read-only view),
+        lists/dicts/sets of immutable scalars get a shallow copy, and everything else gets a deep copy.
+    """
+    value_type = type(value)
+    if is_immutable(value):
+        return value
+    elif value_type is np.ndarray and value.dtype != object:
+        if READ_ONLY_ARRAYS:
+            view = value.view()
+            view.flags.writeable = False
+            return view
+        return value.copy()
+    elif (value_type is list or value_type is set) and has_flat_items(value):
+        return value.copy()
+    elif value_type is dict and has_flat_items(value.values()):
+        return value.copy()
+    else:
+        return copy.deepcopy(value)
+
+
+def isolate_params(params: dict):
+    """Isolates every parameter of a function parameter dictionary."""
+    return {param_name: isolate(param_value) for param_name, param_value in params.items()}
+
+
+def find_mutated_params(original_params: dict, params: dict):
+    """Finds the names of the parameters that were modified compared to their original values. Only checks arrays, lists, dicts, and sets."""
+    mutated = []
+    for param_name, param_value in params.items():
+        original_value = original_params[param_name]
+        param_type = type(param_value)
+        if param_type is np.ndarray and param_value.flags.writeable:
+            # NaN is never equal to itself so untouched float arrays with NaN would look modified
+            equal_nan = np.issubdtype(param_value.dtype, np.inexact)
+            if param_value.shape != original_value.shape or not np.array_equal(param_value, original_value, equal_nan=equal_nan):
+                mutated.append(param_name)
+        elif param_type is list or param_type is dict or param_type is set:
+            try:
+                if param_value != original_value:
+                    mutated.append(param_name)
+            except (ValueError, TypeError):
+                pass
+    return mutated
@@ -0,0 +1,72 @@
+import os
+import json
+import pathlib
+
+
+class GradingJournal:
+    """
+    Append-only log of the grading results, written as soon as each function and student is graded.
+
+    If a run crashes the journal keeps everything graded so far, and a new run can resume from it.
+    Each line is a JSON record, either {"type": "function", ...} or {"type": "student", ...}.
+    Workers append with O_APPEND and a single write per record so processes do not mix their lines.
+    """
+
+    def __init__(self, journal_path: pathlib.Path, resume: bool):
+        self.journal_path = journal_path
+        self.fd = None
+
+        # Start a new journal unless we are resuming a previous run
+        if not resume and self.journal_path.exists():
+            self.journal_path.unlink()
+
+        # A crash can leave the last record cut off, end it so new records start on their own line
+        if resume and self.journal_path.exists():
+            with open(self.journal_path, 'rb+') as file:
+                file.seek(0, os.SEEK_END)
+                if file.tell() > 0:
+                    file.seek(-1, os.SEEK_END)
+                    if file.read(1) != b'\n':
+                        file.write(b'\n')
+
+    def __getstate__(self):
+        # File descriptors are per process, the worker opens its own
+        state = self.__dict__.copy()
+        state['fd'] = None
+        return state
+
+    def append(self, record: dict):
+        """Appends a record to the journal."""
+        if self.fd is None:
+            self.fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        os.write(self.fd, (json.dumps(record, default=str) + '\n').encode())
+
+    def write_function(self, fpath: pathlib.Path, student_name: str, fn_name: str, score: float):
+        """Records the score of a graded function."""
+        self.append({'type': 'function', 'fpath': str(fpath), 'student': student_name, 'fn_name': fn_name, 'score': score})
+
+    def write_student(self, fpath: pathlib.Path, scores: dict):
+        """Records the scores of a student that finished grading."""
+        self.append({'type': 'student', 'fpath': str(fpath), 'scores': scores})
+
+    def read(self):
+        """Reads all the records of the journal, ignoring a last line that was cut off by a crash."""
+        if not self.journal_path.exists():
+            return []
+
+        records = []
+        with open(self.journal_path, 'r') as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records
+
+    def student_peak_memory(self):
+        """Gets the latest peak memory (in MB) of each function of every graded student, keyed by the student file path."""
+        return {record['fpath']: record['fn_peak_mb'] for record in self.read() if record['type'] == 'memory' and 'fn_peak_mb' in record}
+
+    def student_scores(self):
+        """Gets the latest scores of every finished student, keyed by the student file path."""
+        return {record['fpath']: record['scores'] for record in self.read() if record['type'] == 'student'}
@@ -0,0 +1,103 @@
+import sys
+import resource
+
+BYTES_IN_MB = 1024 * 1024
+
+
+def __read_status_kb__(field):
+    """Reads a memory field (in KB) of /proc/self/status. Returns None when not available (not Linux)."""
+    try:
+        with open('/proc/self/status', 'r') as file:
+            for line in file:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def address_space_mb():
+    """Gets the virtual memory (address space) of this process in MB, or None if it cannot be read."""
+    size_kb = __read_status_kb__('VmSize:')
+    return None if size_kb is None else size_kb / 1024
+
+
+def current_rss_mb():
+    """Gets the resident memory of this process in MB, or None if it cannot be read."""
+    rss_kb = __read_status_kb__('VmRSS:')
+    return None if rss_kb is None else rss_kb / 1024
+
+
+def reset_peak_rss():
+    """Resets the peak resident memory of this process to its current resident memory. Only possible on Linux."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Gets the peak resident memory of this process in MB since it started or since reset_peak_rss()."""
+    peak_kb = __read_status_kb__('VmHWM:')
+    if peak_kb is not None:
+        return peak_kb / 1024
+
+    # Peak of the whole process, ru_maxrss is in bytes on macOS and in KB everywhere else
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / BYTES_IN_MB if sys.platform == 'darwin' else max_rss / 1024
+
+
+class MemoryLimit:
+    """
+    Limits how much more memory (address space) the student code can allocate.
+
+    The limit is relative to the memory the process used when the student started (see start()), so the grader, NumPy,
+    and the solution do not count against the student. It is only applied while student code runs (use it as a context manager)
+    so the grader itself never gets a MemoryError. Allocations past the limit raise MemoryError inside the student code
+    instead of pushing the machine into swap.
+    Linux does not enforce limits on resident memory (RLIMIT_RSS) so the address space (RLIMIT_AS) is limited instead.
+    """
+
+    def __init__(self, limit_mb: float = None):
+        self.limit_mb = limit_mb
+        self.limit_bytes = None
+        self.original_limits = None
+
+    def __enter__(self):
+        self.apply()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.restore()
+
+    def start(self):
+        """Measures the memory the process uses before the student starts. Does nothing when there is no limit or the memory cannot be read."""
+        self.limit_bytes = None
+        if self.limit_mb is None:
+            return
+
+        used_mb = address_space_mb()
+        if used_mb is None:
+            return
+
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        self.limit_bytes = int((used_mb + self.limit_mb) * BYTES_IN_MB)
+        if hard != resource.RLIM_INFINITY:
+            self.limit_bytes = min(self.limit_bytes, hard)
+
+    def apply(self):
+        """Starts limiting the memory. Does nothing unless start() measured the memory of the process."""
+        if self.limit_bytes is None:
+            return
+
+        soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (self.limit_bytes, hard))
+        self.original_limits = (soft, hard)
+
+    def restore(self):
+        """Stops limiting the memory."""
+        if self.original_limits is not None:
+            resource.setrlimit(resource.RLIMIT_AS, self.original_limits)
+            self.original_limits = None
@@ -0,0 +1,54 @@
+import gc
+import re
+import sys
+import pathlib
+import itertools
+import importlib.util
+
+# Numbers the student modules loaded by this process so their names never repeat
+__module_counter__ = itertools.count()
+
+
+class StudentModuleLoader:
+    """
+    Loads a student file as a module with a unique name and unloads it (and the student files it imported) when done.
+
+    Loading through an importlib spec instead of __import__(stem) means two submissions with the same filename never share
+    a module, and unloading keeps long-running workers from holding on to every student they graded.
+    """
+
+    def __init__(self, fpath: pathlib.Path, local_dir: pathlib.Path):
+        self.fpath = fpath
+        self.local_dir = local_dir.resolve()
+        self.module_name = f'student_{re.sub(r"[^A-Za-z0-9_]", "_", fpath.stem)}_{next(__module_counter__)}'
+        self.loaded_modules = None
+
+    def load(self):
+        """Imports the student file, returning the module."""
+        # Remember what was loaded before so the modules imported by the student can be told apart
+        self.loaded_modules = set(sys.modules.keys())
+
+        spec = importlib.util.spec_from_file_location(self.module_name, self.fpath)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[self.module_name] = module
+        spec.loader.exec_module(module)
+        return module
+
+    def unload(self):
+        """Removes the student module and the modules it imported from the student directory. Libraries stay loaded for the next student."""
+        if self.loaded_modules is None:
+            return
+
+        for module_name in set(sys.modules.keys()) - self.loaded_modules:
+            if module_name == self.module_name or self.__is_local__(sys.modules.get(module_name)):
+                sys.modules.pop(module_name, None)
+        self.loaded_modules = None
+
+        # Student modules reference themselves through their functions so only the cycle collector can free them
+        gc.collect()
+
+    def __is_local__(self, module):
+        module_file = getattr(module, '__file__', None)
+        if not module_file:
+            return False
+        return self.local_dir in pathlib.Path(module_file).resolve().parents
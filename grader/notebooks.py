@@ -0,0 +1,96 @@
+import json
+import pathlib
+
+# Lines starting with these characters are IPython magics or shell commands that plain Python cannot run
+MAGIC_PREFIXES = ('%', '!')
+
+
+def notebook_cells(notebook: dict):
+    """Gets the source code of all the code cells of a notebook as strings."""
+    # nbformat 4 stores cells at the top level, nbformat 3 inside worksheets and under "input"
+    if 'cells' in notebook:
+        cells, source_key = notebook['cells'], 'source'
+    else:
+        cells, source_key = [cell for ws in notebook.get('worksheets', []) for cell in ws['cells']], 'input'
+
+    for cell in cells:
+        if cell.get('cell_type') != 'code':
+            continue
+        source = cell.get(source_key, '')
+        yield ''.join(source) if isinstance(source, list) else source
+
+
+def __scan_line__(line: str, depth: int, quote: str):
+    """
+    Follows the brackets and strings of a line of code, starting inside "depth" open brackets and the string opened with "quote" (or None).
+
+    Returns the bracket depth and the open string quote at the end of the line, and whether the next line continues this logical line.
+    """
+    idx = 0
+    is_comment = False
+    while idx < len(line):
+        char = line[idx]
+        if quote:
+            if char == '\\':
+                idx += 2
+            elif line.startswith(quote, idx):
+                idx += len(quote)
+                quote = None
+            else:
+                idx += 1
+            continue
+
+        if char == '#':
+            is_comment = True
+            break
+        if char in '\'"':
+            quote = line[idx:idx+3] if line[idx:idx+3] in ('"""', "'''") else char
+            idx += len(quote)
+            continue
+        if char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth = max(0, depth - 1)
+        idx += 1
+
+    # Only triple-quoted strings and lines ending with a backslash go on to the next line
+    is_backslash = line.endswith('\\') and not is_comment
+    if quote in ('"', "'") and not is_backslash:
+        quote = None
+    return depth, quote, depth > 0 or quote is not None or is_backslash
+
+
+def notebook_to_python(notebook: dict):
+    """Converts the code cells of a notebook into a Python script, commenting out magics and shell commands."""
+    lines = []
+    for cell_idx, source in enumerate(notebook_cells(notebook)):
+        lines.append(f'# In[{cell_idx+1}]:')
+
+        # Cell magics (%%time, %%capture, etc.) apply to the whole cell so comment it out entirely
+        is_cell_magic = source.lstrip().startswith('%%')
+
+        # Magics can only start a logical line, "%" and "!" inside brackets or strings are plain Python
+        depth, quote, is_continued = 0, None, False
+        for line in source.splitlines():
+            stripped = line.lstrip()
+            if is_cell_magic:
+                lines.append(f'# {line}')
+            elif not is_continued and stripped.startswith(MAGIC_PREFIXES):
+                # Keep indented blocks valid by leaving a pass statement in place of the magic
+                indent = line[:len(line) - len(stripped)]
+                lines.append(f'{indent}pass  # {stripped}' if indent else f'# {line}')
+            else:
+                depth, quote, is_continued = __scan_line__(line, depth, quote)
+                lines.append(line)
+        lines.append('\n')
+
+    return '\n'.join(lines)
+
+
+def convert_notebook(fpath: pathlib.Path):
+    """Converts the given Jupyter notebook into a Python script next to it."""
+    with open(fpath, 'r', encoding='utf-8') as file:
+        notebook = json.load(file)
+
+    with open(fpath.with_suffix('.py'), 'w', encoding='utf-8') as file:
+        file.write(notebook_to_python(notebook))
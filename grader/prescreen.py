@@ -0,0 +1,84 @@
+import ast
+import pathlib
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+from timeit import default_timer as timer
+
+# Top-level statements that run (possibly for a long time) as soon as a submission is imported
+EXPENSIVE_STATEMENTS = (ast.While, ast.For, ast.AsyncFor)
+
+
+def __is_main_guard__(node):
+    """Determines if a statement is the "if __name__ == '__main__':" guard."""
+    return (isinstance(node, ast.If) and isinstance(node.test, ast.Compare) and isinstance(node.test.left, ast.Name)
+            and node.test.left.id == '__name__')
+
+
+def __has_call__(node):
+    return any(isinstance(child, ast.Call) for child in ast.walk(node))
+
+
+def find_expensive_statements(tree):
+    """Finds the line numbers of the top-level loops and function calls that run on import."""
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) or __is_main_guard__(node):
+            continue
+        if isinstance(node, EXPENSIVE_STATEMENTS) or __has_call__(node):
+            lines.append(node.lineno)
+    return lines
+
+
+def find_defined_functions(tree):
+    """Finds the functions defined in a module using the same names as SolutionCode (class functions are "Class.fn()")."""
+    fn_names = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            fn_names.add(node.name)
+        elif isinstance(node, ast.ClassDef):
+            for class_node in node.body:
+                if isinstance(class_node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    fn_names.add(f'{node.name}.{class_node.name}()')
+    return fn_names
+
+
+def screen_submission(fpath: pathlib.Path, graded_fnames: list):
+    """
+    Compiles a submission without running it.
+
+    Returns a dictionary with the syntax error (if any), the lines of the expensive top-level statements,
+    and the graded functions that are not defined in the submission.
+    """
+    screen = {'syntax_error': None, 'expensive_lines': [], 'missing_fns': []}
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            tree = compile(fpath.read_bytes(), str(fpath), 'exec', ast.PyCF_ONLY_AST)
+    except (SyntaxError, ValueError) as ex:
+        screen['syntax_error'] = f'{ex.__class__.__name__}: {ex}'
+        return screen
+
+    screen['expensive_lines'] = find_expensive_statements(tree)
+    defined_fns = find_defined_functions(tree)
+    screen['missing_fns'] = [fn_name for fn_name in graded_fnames if fn_name not in defined_fns]
+    return screen
+
+
+def screen_all_submissions(fpaths: list, graded_fnames: list, n_workers: int):
+    """Screens all submissions in parallel. Returns a dictionary of the screen of each submission keyed by its path as a string."""
+    print(f'[Debug] Pre-screening {len(fpaths)} submissions')
+    start_t = timer()
+    if n_workers <= 1 or len(fpaths) <= 1:
+        screens = [screen_submission(fpath, graded_fnames) for fpath in fpaths]
+    else:
+        # Compiling is CPU-bound so use processes, sending the files in chunks to keep the overhead low
+        with ProcessPoolExecutor(n_workers) as executor:
+            chunksize = max(1, len(fpaths) // (4 * n_workers))
+            screens = list(executor.map(screen_submission, fpaths, [graded_fnames] * len(fpaths), chunksize=chunksize))
+
+    all_screens = {str(fpath): screen for fpath, screen in zip(fpaths, screens)}
+    n_syntax_errors = sum(screen['syntax_error'] is not None for screen in screens)
+    n_expensive = sum(len(screen['expensive_lines']) > 0 for screen in screens)
+    print(f'[Debug] Pre-screening took {timer()-start_t:.2f}sec | {n_syntax_errors} syntax errors | {n_expensive} with expensive top-level code')
+    return all_screens
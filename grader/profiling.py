@@ -0,0 +1,85 @@
+import json
+import pathlib
+from timeit import default_timer as timer
+
+# Phases of grading a test case (see TestCaseGenerator.__getitem__) plus importing the student module and complexity tests
+PHASES = ['import', 'param_generation', 'solution_run', 'param_copy', 'class_construction', 'student_run', 'comparison', 'feedback', 'complexity']
+
+
+class PhaseProfiler:
+    """Adds up the time spent in each grading phase for every function of a student."""
+
+    def __init__(self):
+        self.fn_phases = {}
+
+    def add(self, fn_name, phase, duration_sec):
+        """Adds time to a phase of a function."""
+        phases = self.fn_phases.get(fn_name)
+        if phases is None:
+            phases = self.fn_phases[fn_name] = dict.fromkeys(PHASES, 0.0)
+        phases[phase] += duration_sec
+
+    def lap(self, fn_name, phase, start_t):
+        """Adds the time since start_t to a phase and returns the current time so the next phase can start from it."""
+        now_t = timer()
+        self.add(fn_name, phase, now_t - start_t)
+        return now_t
+
+    def phase_totals(self):
+        """Adds up the time of each phase across all functions."""
+        totals = dict.fromkeys(PHASES, 0.0)
+        for phases in self.fn_phases.values():
+            for phase, duration_sec in phases.items():
+                totals[phase] += duration_sec
+        return totals
+
+
+def build_profile_report(profile_records: list, n_outliers: int = 5):
+    """Builds the profiling report of the cohort from the profile records of every student."""
+    # Only needed for the report, importing it here keeps the command-line startup fast
+    import numpy as np
+
+    students = sorted(profile_records, key=lambda record: record['total_sec'], reverse=True)
+    totals = np.array([record['total_sec'] for record in students]) if students else np.zeros(1)
+
+    # Cohort summary of each phase (seconds added up over all students and functions)
+    phase_sums = dict.fromkeys(PHASES, 0.0)
+    fn_sums = {}
+    for record in students:
+        for fn_name, phases in record['functions'].items():
+            fn_sums[fn_name] = fn_sums.get(fn_name, 0.0) + sum(phases.values())
+            for phase, duration_sec in phases.items():
+                phase_sums[phase] += duration_sec
+    measured_sec = max(sum(phase_sums.values()), 1e-9)
+
+    return {
+        'cohort': {
+            'n_students': len(students),
+            'total_sec': float(totals.sum()),
+            'student_sec_mean': float(totals.mean()),
+            'student_sec_p50': float(np.percentile(totals, 50)),
+            'student_sec_p95': float(np.percentile(totals, 95)),
+            'student_sec_max': float(totals.max()),
+            'phases_sec': phase_sums,
+            'phases_share': {phase: duration_sec / measured_sec for phase, duration_sec in phase_sums.items()},
+            'functions_sec': fn_sums,
+            'outliers': [{'student': record['student'], 'total_sec': record['total_sec']} for record in students[:n_outliers]],
+        },
+        'students': students,
+    }
+
+
+def write_profile_report(report: dict, report_path: pathlib.Path):
+    """Writes the profiling report as JSON and prints the cohort summary."""
+    with open(report_path, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    cohort = report['cohort']
+    print(f'[Profile] {cohort["n_students"]} students graded in {cohort["total_sec"]:.2f}s of worker time '
+          f'(per student mean={cohort["student_sec_mean"]:.2f}s p50={cohort["student_sec_p50"]:.2f}s p95={cohort["student_sec_p95"]:.2f}s max={cohort["student_sec_max"]:.2f}s)')
+    for phase in PHASES:
+        print(f'[Profile] {phase:>20} {cohort["phases_sec"][phase]:10.3f}s {cohort["phases_share"][phase]*100:6.1f}%')
+    for fn_name, duration_sec in sorted(cohort['functions_sec'].items(), key=lambda item: item[1], reverse=True):
+        print(f'[Profile] fn="{fn_name}" {duration_sec:.3f}s')
+    print(f'[Profile] Slowest students = {[(outlier["student"], round(outlier["total_sec"], 2)) for outlier in cohort["outliers"]]}')
+    print(f'[Profile] Full report saved to {report_path}')
@@ -0,0 +1,126 @@
+import sys
+import threading
+import multiprocessing
+from timeit import default_timer as timer
+
+from tqdm import tqdm
+
+REFRESH_S = 0.5  # How often the progress of the cohort is redrawn
+N_SLOWEST = 3  # How many of the slowest students still being graded are shown
+
+
+class ProgressReporter:
+    """
+    Sends the progress of one student to the ProgressRenderer of the grading process.
+
+    Events are only sent when the student starts, when its status changes (once per function), and when it finishes.
+    Trials are counted with a plain integer increment of n_trials and sent along with the next event.
+    Without a queue (distributed workers, or outside of Grader.grade_files()) nothing is sent.
+    """
+
+    def __init__(self, queue, student_name: str):
+        self.queue = queue
+        self.student_name = student_name
+        self.status = ''
+        self.n_trials = 0
+
+    def send(self, kind: str, status: str = None):
+        if status is not None:
+            self.status = status
+        if self.queue is not None:
+            self.queue.put((kind, self.student_name, self.n_trials, self.status))
+
+    def start(self):
+        self.send('start', 'Starting')
+
+    def log(self, status: str):
+        self.send('status', status)
+
+    def finish(self, status: str = None):
+        self.send('done', status)
+
+
+class ProgressRenderer:
+    """
+    Shows the progress of the whole cohort in a single progress bar, however many processes are grading.
+
+    Workers send small events through a queue (see ProgressReporter) that a thread of the grading process collects,
+    and the bar is redrawn every refresh_s seconds with the throughput, the time left, and the slowest students being graded.
+    The final status of every student is printed once it finishes.
+    """
+
+    def __init__(self, n_students: int, refresh_s: float = REFRESH_S):
+        # Writes go straight to a pipe so events are not lost when a worker exits right after sending them
+        self.queue = multiprocessing.SimpleQueue()
+        self.n_students = n_students
+        self.refresh_s = refresh_s
+
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.finished_lines = []
+        self.n_finished = 0
+        self.n_finished_trials = 0
+
+    def __enter__(self):
+        self.start_t = timer()
+        self.p_bar = tqdm(total=self.n_students, unit='student', file=sys.stderr, dynamic_ncols=True)
+        self.stopped = threading.Event()
+        self.reader = threading.Thread(target=self.__read_events__, daemon=True)
+        self.drawer = threading.Thread(target=self.__draw_periodically__, daemon=True)
+        self.reader.start()
+        self.drawer.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Everything sent before this point is read before the end marker
+        self.queue.put(None)
+        self.reader.join()
+        self.stopped.set()
+        self.drawer.join()
+        self.draw()
+        self.p_bar.close()
+
+    def __read_events__(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            with self.lock:
+                self.record(*event)
+
+    def __draw_periodically__(self):
+        while not self.stopped.wait(self.refresh_s):
+            self.draw()
+
+    def record(self, kind: str, student_name: str, n_trials: int, status: str):
+        """Updates the progress with an event sent by ProgressReporter.send()."""
+        if kind == 'done':
+            self.in_flight.pop(student_name, None)
+            self.n_finished += 1
+            self.n_finished_trials += n_trials
+            self.finished_lines.append(f'[{student_name}] {status}')
+            return
+
+        # Students graded elsewhere can report without having started here
+        if kind == 'start' or student_name not in self.in_flight:
+            self.in_flight[student_name] = [timer(), status, n_trials]
+        self.in_flight[student_name][1:] = [status, n_trials]
+
+    def draw(self):
+        """Prints the students that finished since the last draw and redraws the progress bar."""
+        with self.lock:
+            finished_lines, self.finished_lines = self.finished_lines, []
+            n_new = self.n_finished - self.p_bar.n
+            n_trials = self.n_finished_trials + sum(student[2] for student in self.in_flight.values())
+            slowest = sorted(self.in_flight.items(), key=lambda item: item[1][0])[:N_SLOWEST]
+
+        for line in finished_lines:
+            self.p_bar.write(line, file=sys.stderr)
+
+        now_t = timer()
+        postfix = f'{n_trials / max(now_t - self.start_t, 1e-9):.0f} trials/s'
+        if slowest:
+            postfix += ' | slowest ' + ', '.join(f'{student_name} {now_t - start_t:.0f}s {status}' for student_name, (start_t, status, _) in slowest)
+        self.p_bar.set_postfix_str(postfix, refresh=False)
+        self.p_bar.update(n_new)
+        self.p_bar.refresh()
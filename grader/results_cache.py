@@ -0,0 +1,55 @@
+import os
+import json
+import hashlib
+import pathlib
+
+
+def hash_grader_source():
+    """Hashes the source code of the grader package so cached results are discarded when the grader changes."""
+    sha = hashlib.sha256()
+    for fpath in sorted(pathlib.Path(__file__).parent.glob('*.py')):
+        sha.update(fpath.read_bytes())
+    return sha.hexdigest()
+
+
+class ResultsCache:
+    """
+    Stores the scores, feedback, and function peak memory of every graded submission so unchanged submissions are not graded again.
+
+    Results are keyed by a hash of the student file, the solution file, the grader source code,
+    and the settings that change the grade (test bank seed, max grade, timeout engine).
+    """
+
+    def __init__(self, cache_dir: pathlib.Path, solution_file: pathlib.Path, settings: dict):
+        self.cache_dir = cache_dir
+        if not self.cache_dir.exists():
+            self.cache_dir.mkdir()
+
+        self.base_sha = hashlib.sha256()
+        self.base_sha.update(solution_file.read_bytes())
+        self.base_sha.update(hash_grader_source().encode())
+        self.base_sha.update(json.dumps(settings, sort_keys=True).encode())
+
+    def key(self, fpath: pathlib.Path):
+        """Computes the cache key of the given student file."""
+        sha = self.base_sha.copy()
+        sha.update(fpath.read_bytes())
+        return sha.hexdigest()
+
+    def get(self, fpath: pathlib.Path):
+        """Gets the (scores, feedback, peak memory in MB of each function) of the given student file or None if it has to be graded."""
+        entry_path = self.cache_dir / f'{self.key(fpath)}.json'
+        if not entry_path.exists():
+            return None
+
+        entry = json.loads(entry_path.read_text())
+        return entry['scores'], entry['feedback'], entry['fn_peak_mb']
+
+    def put(self, fpath: pathlib.Path, scores: dict, feedback: str, fn_peak_mb: dict):
+        """Stores the scores, feedback, and peak memory in MB of each function of the given student file."""
+        entry_path = self.cache_dir / f'{self.key(fpath)}.json'
+
+        # Write to a temporary file first so a crash never leaves a half-written entry behind
+        temp_path = entry_path.with_suffix(f'.{os.getpid()}.tmp')
+        temp_path.write_text(json.dumps({'fpath': str(fpath), 'scores': scores, 'feedback': feedback, 'fn_peak_mb': fn_peak_mb}, default=str))
+        temp_path.replace(entry_path)
@@ -1,10 +1,37 @@
 import os
+import copy
 import functools
 import pathlib
 
+import numpy as np
 from timeit import default_timer as timer
 
 from grader.utils import get_module_functions
+from grader.isolation import isolate_params
+from grader.complexity import geometric_sizes, min_duration
+
+
+def batch_item(batch, trial_idx):
+    """Gets the value of one trial from a batch of parameter values, converting NumPy scalars to regular Python types."""
+    item = batch[trial_idx]
+    if isinstance(item, np.generic):
+        return item.item()
+    return item
+
+
+class SolutionTestCase:
+    """The parameters, outputs, and timing of one solution test case."""
+
+    def __init__(self):
+        # Untouched copies of the parameters, students get their own copy of them
+        self.params = None
+        self.class_init_params = None
+
+        # Parameters after the solution ran (the solution may modify them) and the solution results
+        self.sol_params = None
+        self.sol_instnc = None
+        self.sol_output = None
+        self.sol_duration_sec = 0
 
 
 class SolutionCode:
@@ -32,7 +59,7 @@ class SolutionCode:
             if hasattr(fn, 'no_test_cases'):
                 to_remove.append(fn_name)
             else:
-                assert hasattr(fn, 'gen_fn_params') or hasattr(fn, 'set_fn_params'), f'[Debug] Not grading "{fn_name}" due to lack of annotation. Did you forget to annotate it?'
+                assert hasattr(fn, 'gen_fn_params') or hasattr(fn, 'gen_batch_params') or hasattr(fn, 'set_fn_params'), f'[Debug] Not grading "{fn_name}" due to lack of annotation. Did you forget to annotate it?'
 
         for t in to_remove:
             del self.solution_fns[t]
@@ -49,6 +76,67 @@ class SolutionCode:
         self.all_fnames = list(self.solution_fns.keys())
         print(f"[Debug] Grading {len(self.solution_fns)} functions | {self.all_fnames}")
 
+        # Test cases computed ahead of time with precompute_test_cases(), shared by all students
+        self.test_case_cache = {}
+
+        # Parameters generated ahead of time from a seed (see load_test_bank())
+        self.test_bank = None
+        self.test_bank_fns = set()
+        self.test_bank_class_fns = set()
+
+        # Parameters of all the trials of @generate_test_case_batch functions, keyed by function name
+        self.param_batches = {}
+
+        # Input sizes, parameters, and solution durations of the @complexity_test functions (see measure_complexity())
+        self.complexity_cache = {}
+
+    def precompute_test_cases(self):
+        """Runs the solution once for every test case of every function so all students can share the outputs."""
+        print('[Debug] Precomputing solution test cases')
+        start_t = timer()
+        for fn_name, sol_fn in self:
+            is_class_fn = hasattr(sol_fn, 'gen_class_params')
+            sol_instnc = None
+            cases = []
+            for trial_idx in range(sol_fn.max_trials):
+                case = self.create_test_case(fn_name, trial_idx, sol_instnc)
+                sol_instnc = case.sol_instnc
+
+                # Class instances keep changing across trials so store a snapshot of the instance for this trial
+                # Copy the instance and output together so references between them are kept
+                if is_class_fn:
+                    case.sol_instnc, case.sol_output = copy.deepcopy((case.sol_instnc, case.sol_output))
+                cases.append(case)
+
+            self.test_case_cache[fn_name] = cases
+        print(f'[Debug] Precomputing solution test cases took {timer()-start_t:.2f}sec')
+
+    def has_cached_test_cases(self, fn_name):
+        """Determines if the test cases of the specified function were precomputed."""
+        return fn_name in self.test_case_cache
+
+    def create_test_case(self, fn_name, trial_idx, sol_instnc=None):
+        """
+        Generates the parameters of the given test case number and runs the solution with them.
+
+        For class functions a new class instance is created every "trials_per_instance" trials,
+        otherwise the given solution instance is used.
+        """
+        sol_fn = self.solution_fns[fn_name]
+        case = SolutionTestCase()
+
+        if hasattr(sol_fn, 'gen_class_params') and trial_idx % sol_fn.trials_per_instance == 0:
+            sol_instnc, sol_class_init_params = self.create_class_instance(fn_name, trial_idx)
+            case.class_init_params = isolate_params(sol_class_init_params)
+
+        # Keep a copy of the parameters before the solution gets a chance to modify them
+        case.sol_params = self.create_fn_parameters(fn_name, trial_idx)
+        case.params = isolate_params(case.sol_params)
+
+        case.sol_instnc = sol_instnc
+        case.sol_output, case.sol_duration_sec = self.run_fn(fn_name, sol_instnc, case.sol_params)
+        return case
+
     def run_fn(self, fn_name, sol_instnc, sol_params):
         """Runs and times the specified solution function with the specified parameters."""
         sol_fn = self.solution_fns[fn_name]
@@ -64,22 +152,63 @@ class SolutionCode:
         duration_sec = end_t - start_t
         return sol_output, duration_sec
 
+    def measure_complexity(self, fn_name):
+        """
+        Times the solution on the input sizes of its complexity test, keeping the fastest of the repeated runs of each size.
+
+        Returns the input sizes, the parameters of each size, and the solution duration of each size.
+        """
+        if fn_name not in self.complexity_cache:
+            sol_fn = self.solution_fns[fn_name]
+            spec = sol_fn.complexity
+            sizes = geometric_sizes(spec['min_size'], spec['max_size'], spec['n_sizes'])
+            all_params = [sol_fn.gen_size_params(size) for size in sizes]
+            durations_sec = [min_duration(lambda sol_params: self.run_fn(fn_name, None, sol_params), params, spec['repeats'])[0] for params in all_params]
+            self.complexity_cache[fn_name] = (sizes, all_params, durations_sec)
+
+        return self.complexity_cache[fn_name]
+
+    def load_test_bank(self, test_bank):
+        """Serves the function parameters from the given test bank instead of generating them while grading."""
+        self.test_bank = test_bank
+        self.test_bank_fns = {fn_name for fn_name in self.all_fnames if test_bank.has_fn(fn_name)}
+        self.test_bank_class_fns = {fn_name for fn_name in self.all_fnames if test_bank.has_class(fn_name)}
+
     def create_fn_parameters(self, fn_name, trial_idx):
+        """Gets function parameters for the specified function from the test bank or generates them."""
+        if fn_name in self.test_bank_fns:
+            return self.test_bank.fn_parameters(fn_name, trial_idx)
+        return self.generate_fn_parameters(fn_name, trial_idx)
+
+    def generate_fn_parameters(self, fn_name, trial_idx):
         """Generates function parameters for the specified function or gets them from a fixed test set list."""
         sol_fn = self.solution_fns[fn_name]
         has_param_gen = hasattr(sol_fn, 'gen_fn_params')
+        has_batch_gen = hasattr(sol_fn, 'gen_batch_params')
         if has_param_gen:
             return sol_fn.gen_fn_params()
+        elif has_batch_gen:
+            # Generate the parameters of all trials at once when starting over so every pass gets new test cases
+            if trial_idx == 0 or fn_name not in self.param_batches:
+                self.param_batches[fn_name] = sol_fn.gen_batch_params()
+            return {k_name: batch_item(k_batch, trial_idx) for k_name, k_batch in self.param_batches[fn_name].items()}
         else:
             return sol_fn.set_fn_params[trial_idx]
 
-    def create_class_instance(self, fn_name):
+    def generate_class_parameters(self, fn_name):
+        """Generates the parameters for the __init__ function of the class of a given function."""
+        return self.solution_fns[fn_name].gen_class_params()
+
+    def create_class_instance(self, fn_name, trial_idx=0):
         """Creates an instance of a class from the solution module for a given function."""
         sol_fn = self.solution_fns[fn_name]
         sol_constructor_fn = self.solution_constructors[fn_name]
 
-        # Generate parameters for __init__ function.
-        sol_class_init_params = sol_fn.gen_class_params()
+        # Get parameters for __init__ function from the test bank or generate them
+        if fn_name in self.test_bank_class_fns:
+            sol_class_init_params = self.test_bank.class_parameters(fn_name, trial_idx // sol_fn.trials_per_instance)
+        else:
+            sol_class_init_params = self.generate_class_parameters(fn_name)
 
         # Run the solution class constructor
         if sol_class_init_params:
@@ -0,0 +1,30 @@
+import math
+from statistics import NormalDist
+
+
+class EarlyStopping:
+    """
+    Sequential stopping rule for the test cases of a function.
+
+    Keeps a Wilson score confidence interval of the pass rate and stops once the pass rate is known
+    to within +/- "resolution" with the given confidence. Students that pass (or fail) everything stop
+    early, students in between need more test cases.
+    """
+
+    def __init__(self, resolution: float, confidence: float, min_trials: int):
+        self.resolution = resolution
+        self.confidence = confidence
+        self.min_trials = min_trials
+        self.z = NormalDist().inv_cdf((1 + confidence) / 2)
+
+    def half_width(self, n_passed, n_trials):
+        """Computes the half-width of the confidence interval of the pass rate."""
+        if n_trials == 0:
+            return 1
+        p = n_passed / n_trials
+        z2 = self.z * self.z
+        return self.z * math.sqrt(p * (1 - p) / n_trials + z2 / (4 * n_trials * n_trials)) / (1 + z2 / n_trials)
+
+    def should_stop(self, n_passed, n_trials):
+        """Determines if the pass rate is known well enough to stop running test cases."""
+        return n_trials >= self.min_trials and self.half_width(n_passed, n_trials) <= self.resolution
@@ -3,19 +3,20 @@ import traceback
 import sys
 import pathlib
 import functools
-
-from tqdm import tqdm
-import wrapt_timeout_decorator
+from timeit import default_timer as timer
 
 from grader.utils import get_module_functions, Colors
+from grader.timeouts import StudentTimeoutException, TimeoutEngine
+from grader.feedback_writer import FeedbackWriter
+from grader.profiling import PhaseProfiler
+from grader.memory import MemoryLimit
+from grader.module_loader import StudentModuleLoader
+from grader.progress import ProgressReporter
+from grader.attempts import AttemptIndex, parse_attempt
+from grader.constants import TIMEOUT_S, TIMEOUT_BUDGET_S, IMPORT_TIMEOUT_S
 
-TIMEOUT_S = 1  # 0.1  # How many seconds should we allow student functions to run before terminating them
 DEBUG = False
 
-class StudentTimeoutException(Exception):
-    """Exception that is raised when a student function takes too long to run and is timed out."""
-    pass
-
 
 class SilenceOutput:
     """Silences stdout. Useful to ignore student print() statements."""
@@ -32,57 +33,65 @@ class SilenceOutput:
 
 
 class StudentCode:
-    def __init__(self, student_dir: pathlib.Path, student_fpath: pathlib.Path, all_student_files: list):
+    def __init__(self, student_dir: pathlib.Path, student_fpath: pathlib.Path, attempt_index: AttemptIndex, timeout_engine: TimeoutEngine, memory_limit_mb: float = None,
+                 import_timeout_s: float = IMPORT_TIMEOUT_S, progress_queue=None):
         self.student_dir = student_dir
         self.fpath = student_fpath
-        self.all_student_files = all_student_files
+        self.attempt_index = attempt_index
+        self.timeout_engine = timeout_engine
+        self.memory_limit = MemoryLimit(memory_limit_mb)
+        self.import_timeout_s = import_timeout_s
+        self.loader = StudentModuleLoader(student_fpath, student_dir)
+        self.progress_queue = progress_queue
 
         assert self.fpath.exists(), f'Student file {student_fpath} does not exist'
-        assert len(all_student_files) > 0, 'Student files must be positive'
 
         self.feedback_dir = self.student_dir / 'feedback'
         assert self.feedback_dir.exists(), f'Student feedback directory {self.feedback_dir} does not exist. Was "Grader" unable to __init__ correctly?'
 
-        self.header = ''
+        self.__find_attempt_name__()
 
-    def __enter__(self):
+    def __find_attempt_name__(self):
+        """Determines the student name and the feedback filename of this attempt."""
         # Determine if it's a Blackboard bulk download file in the format
         # {assignment name}_{student username}_attempt_{date}_{filename}
-        split_filename = self.fpath.stem.split('_')
-        is_bulk_blackboard = len(split_filename) >= 4
+        parsed_attempt = parse_attempt(self.fpath)
 
-        # If it's a Blackboard file, sort all attempts based on date and assign this attempt a simple number
+        # If it's a Blackboard file, number this attempt by date among all attempts of the student (see AttemptIndex)
         # for the feedback output file. Otherwise make the feedback output file the same name as the attempt file
-        if is_bulk_blackboard:
-            student_name = split_filename[1]
-            date = split_filename[3]
-
-            # Gather and then sort all Blackboard attempts based on date
-            other_attempt_dates = []
-            for att_path in self.all_student_files:
-                split_att_path = att_path.stem.split('_')
-                if len(split_att_path) < 4 or split_att_path[1] != student_name:
-                    continue
-                other_attempt_dates.append(split_att_path[3])
-            other_attempt_dates = sorted(other_attempt_dates)
-
-            attempt_number = other_attempt_dates.index(date)+1
+        if parsed_attempt:
+            student_name, _ = parsed_attempt
+            attempt_number = self.attempt_index.attempt_number(self.fpath)
 
             self.feedback_filename = f'{student_name}_attempt{attempt_number}.bbtxt'
             self.student_name = f'{student_name}_{attempt_number}'
-            # print(f'[Auto-Grader] Grading {self.student_name} blackboard attempt {attempt_number} / {len(other_attempt_dates)}')
+            # print(f'[Auto-Grader] Grading {self.student_name} blackboard attempt {attempt_number} / {len(self.attempt_index.student_attempts(student_name))}')
         else:
             self.feedback_filename = f'{self.fpath}.bbtxt'
             self.student_name = f'{self.fpath.stem}'
             # print(f'[Auto-Grader] Grading {self.student_name} attempt')
 
-        # Open the feedback file and progress bar
-        self.feedback = open(self.feedback_dir / self.feedback_filename, 'w')
-        self.p_bar = tqdm()
+        self.feedback_path = self.feedback_dir / self.feedback_filename
+
+    def __enter__(self):
+        # Time budgets are per student
+        self.timeout_engine.reset()
+
+        # Open the feedback file and report the progress to the grading process
+        self.feedback = FeedbackWriter(self.feedback_path)
+        self.progress = ProgressReporter(self.progress_queue, self.student_name)
+        self.progress.start()
+        self.profiler = PhaseProfiler()
+
+        # The memory limit is relative to what the process uses now, and only applies while student code runs
+        self.memory_limit.start()
+        self.fn_peak_mb = {}
 
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.memory_limit.restore()
+
         if exc_type is not None:
             self.write_feedback(f'[AutoGrader: StudentCode] Got exception type [{exc_type}] with value [{exc_val}], unable to proceed with grading')
             self.write_feedback(traceback.format_tb(exc_tb))
@@ -90,8 +99,11 @@ class StudentCode:
 
         self.feedback.close()
 
-        self.p_bar.n = self.p_bar.total
-        self.p_bar.close()
+        self.progress.finish()
+
+        # Drop our references to the student code so unloading the module frees it
+        self.fns, self.constructors = {}, {}
+        self.loader.unload()
 
     def import_module(self):
         """Imports the student module, its functions, and the class constructors."""
@@ -101,7 +113,9 @@ class StudentCode:
         os.chdir(self.fpath.parent)
         with SilenceOutput():
             try:
-                module = __import__(self.fpath.stem)
+                # Top-level code runs on import so it gets time and memory limits too
+                with self.memory_limit:
+                    module = self.timeout_engine.run_with_limit(self.import_timeout_s, self.loader.load)
                 self.fns, self.constructors = get_module_functions(module)
             except Exception as ex:
                 self.write_feedback(f'[AutoGrader] Could not import module due to exception {ex}')
@@ -113,26 +127,13 @@ class StudentCode:
         return import_exception
 
     def write_feedback(self, msg):
-        """Writes feedback to the student output file."""
+        """Writes feedback to the student output file. The message can be a function returning the string so it is only formatted when written."""
         assert hasattr(self, 'feedback'), f'You must use the with statement when using this class'
-
-        n_bytes = self.feedback.tell()
-        bytes_in_mb = 1e6
-        mb_max = 10
-        if n_bytes < mb_max * bytes_in_mb:
-            self.feedback.write(f'{msg}\n')
-        else:
-            raise Exception(f'[Debug] Student {self.student_name} has more than {mb_max}MBs of feedback')
+        self.feedback.write(msg)
 
     def log(self, msg):
-        """Writes a log to the student progress bar"""
-        self.p_bar.desc = f'[{self.student_name}] {msg}'
-
-    def log_postfix(self, msg):
-        self.p_bar.postfix = f'{Colors.T_CYAN}{self.header} | {msg}{Colors.T_RESET}'
-
-    def log_progress(self, trial_idx, n_trials):
-        self.header = f'Test Case #{trial_idx+1}/{n_trials}'
+        """Sets the status of the student shown in the progress of the grader. Only call it once per function, not once per trial."""
+        self.progress.log(msg)
 
     def has_fn(self, fn_name):
         """Determines if the given function name is in the student code"""
@@ -140,6 +141,32 @@ class StudentCode:
 
     def run_fn(self, fn_name, stu_instnc, stu_params):
         """Runs the provided function given the function name."""
+        stu_fn = self.__get_fn__(fn_name, stu_instnc)
+        with SilenceOutput():
+            return self.__run_fn_timeout__(fn_name, stu_fn, **stu_params)
+
+    def time_fn(self, fn_name, stu_instnc, stu_params):
+        """
+        Runs the provided function like run_fn() but only times the student function itself, without the time and memory limits around it.
+
+        Returns the output (or the exception) and the duration in seconds, like SolutionCode.run_fn() does for the solution.
+        """
+        stu_fn = self.__get_fn__(fn_name, stu_instnc)
+        durations_sec = []
+
+        @functools.wraps(stu_fn)
+        def timed_fn(*args, **kwargs):
+            start_t = timer()
+            try:
+                return stu_fn(*args, **kwargs)
+            finally:
+                durations_sec.append(timer() - start_t)
+
+        with SilenceOutput():
+            stu_output = self.__run_fn_timeout__(fn_name, timed_fn, **stu_params)
+        return stu_output, durations_sec[0] if durations_sec else 0
+
+    def __get_fn__(self, fn_name, stu_instnc):
         assert hasattr(self, 'fns'), 'You must call import_module() first before calling run_fn'
 
         if fn_name not in self.fns.keys():
@@ -151,9 +178,7 @@ class StudentCode:
         if stu_instnc:
             stu_fn = functools.partial(stu_fn, stu_instnc)
             stu_fn = functools.wraps(self.fns[fn_name])(stu_fn)
-
-        with SilenceOutput():
-            return self.__run_fn_timeout__(stu_fn, **stu_params)
+        return stu_fn
 
     def create_class_instance(self, fn_name, **constructor_kwargs):
         """Creates an instance of the class needed to run the provided function."""
@@ -161,19 +186,25 @@ class StudentCode:
             raise Exception(f'Function {fn_name} was expected to be inside a class but it was not')
 
         constructor_fn = self.constructors[fn_name]
-        with SilenceOutput():
+        with SilenceOutput(), self.memory_limit:
             if constructor_kwargs:
                 return constructor_fn(**constructor_kwargs)
             else:
                 return constructor_fn()
 
-    def __run_fn_timeout__(self, fn, *args, **kwargs):
+    def __run_fn_timeout__(self, fn_name, fn, *args, **kwargs):
         """Runs the given function with a time limit."""
         try:
-            return wrapt_timeout_decorator.timeout(TIMEOUT_S, use_signals=True, timeout_exception=StudentTimeoutException)(fn)(*args, **kwargs)
+            # The limit is lifted before any of the handlers below run
+            with self.memory_limit:
+                return self.timeout_engine.run(fn_name, fn, *args, **kwargs)
         except StudentTimeoutException as ex:
             self.tb = traceback.format_exc()
             return ex
+        except MemoryError as ex:
+            # The traceback keeps the frames of the student code alive, and with them whatever they allocated
+            self.tb = traceback.format_exc()
+            return ex.with_traceback(None)
         except OSError as ex:
             self.tb = traceback.format_exc()
             return ex
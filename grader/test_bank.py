@@ -0,0 +1,135 @@
+import re
+import json
+import mmap
+import pickle
+import random
+import hashlib
+import pathlib
+import zlib
+
+import numpy as np
+from timeit import default_timer as timer
+
+
+class TestBank:
+    """
+    Stores the test case parameters of every function on disk so all workers and all students grade the same cases.
+
+    The parameters of each function are generated from their own seed (a SeedSequence per function) so runs can be reproduced.
+    Every function is stored as a file of concatenated pickles plus an index of offsets, and both are memory-mapped
+    by the workers to read the parameters of a single test case without loading the whole bank.
+    """
+
+    def __init__(self, bank_dir: pathlib.Path, seed: int):
+        self.bank_dir = bank_dir
+        self.seed = seed
+        self.manifest_path = self.bank_dir / 'manifest.json'
+
+        # Memory maps are opened lazily the first time each worker needs them
+        self.maps = {}
+
+        # Only the functions listed in the manifest are served from the bank (see build())
+        self.banked = {}
+
+    def __getstate__(self):
+        # Memory maps cannot be pickled, the worker will open its own
+        state = self.__dict__.copy()
+        state['maps'] = {}
+        return state
+
+    def build(self, sol_code, solution_file: pathlib.Path):
+        """Generates the parameters of all the solution functions, skipping the generation if the bank is up-to-date."""
+        # Fixed test sets are already the same for everyone so only generated parameters are banked
+        # Function name -> whether its class constructor parameters are banked too
+        banked = {fn_name: hasattr(fn, 'gen_class_params') for fn_name, fn in sol_code if not hasattr(fn, 'set_fn_params')}
+        manifest = {
+            'seed': self.seed,
+            'solution_hash': hashlib.sha256(solution_file.read_bytes()).hexdigest(),
+            'functions': {fn_name: fn.max_trials for fn_name, fn in sol_code if hasattr(fn, 'max_trials')},
+            'banked': banked,
+        }
+        self.banked = banked
+        if self.manifest_path.exists() and json.loads(self.manifest_path.read_text()) == manifest:
+            print(f'[Debug] Using existing test bank {self.bank_dir} with seed {self.seed}')
+            return
+
+        print(f'[Debug] Generating test bank {self.bank_dir} with seed {self.seed}')
+        start_t = timer()
+        if not self.bank_dir.exists():
+            self.bank_dir.mkdir()
+
+        # Remove the manifest first so an interrupted build is regenerated next time, then the files of functions
+        # that are no longer banked (moved to a fixed test set, removed, or without class parameters anymore)
+        self.manifest_path.unlink(missing_ok=True)
+        keys = set(banked.keys()) | set(f'{fn_name}.class' for fn_name, has_class in banked.items() if has_class)
+        keep_paths = set(self.__data_path__(key) for key in keys)
+        keep_paths |= set(data_path.with_suffix('.npy') for data_path in keep_paths)
+        for bank_path in list(self.bank_dir.glob('*.bin')) + list(self.bank_dir.glob('*.npy')):
+            if bank_path not in keep_paths:
+                bank_path.unlink()
+
+        for fn_name, has_class in banked.items():
+            sol_fn = sol_code.solution_fns[fn_name]
+            fn_seed, class_seed = self.__seed_sequence__(fn_name).spawn(2)
+
+            self.__seed__(fn_seed)
+            self.__write__(fn_name, [sol_code.generate_fn_parameters(fn_name, trial_idx) for trial_idx in range(sol_fn.max_trials)])
+
+            if has_class:
+                n_instances = -(-sol_fn.max_trials // sol_fn.trials_per_instance)
+                self.__seed__(class_seed)
+                self.__write__(f'{fn_name}.class', [sol_code.generate_class_parameters(fn_name) for _ in range(n_instances)])
+
+        # Write the manifest last so an interrupted build is regenerated next time
+        self.manifest_path.write_text(json.dumps(manifest))
+        print(f'[Debug] Generating test bank took {timer()-start_t:.2f}sec')
+
+    def has_fn(self, fn_name):
+        """Determines if the test bank has the parameters of the specified function according to its manifest."""
+        return fn_name in self.banked
+
+    def has_class(self, fn_name):
+        """Determines if the test bank has the class constructor parameters of the specified function according to its manifest."""
+        return self.banked.get(fn_name, False)
+
+    def fn_parameters(self, fn_name, trial_idx):
+        """Gets the function parameters of the given test case number."""
+        return self.__read__(fn_name, trial_idx)
+
+    def class_parameters(self, fn_name, instance_idx):
+        """Gets the class constructor parameters of the given class instance number."""
+        return self.__read__(f'{fn_name}.class', instance_idx)
+
+    def __seed_sequence__(self, fn_name):
+        # Key the sequence on the function name so adding or removing functions does not change the others
+        return np.random.SeedSequence(self.seed, spawn_key=(zlib.crc32(fn_name.encode()),))
+
+    def __seed__(self, seed_seq):
+        # Parameter generators use the global random states (usually np.random) so seed both of them
+        state = int(seed_seq.generate_state(1)[0])
+        np.random.seed(state)
+        random.seed(state)
+
+    def __data_path__(self, key):
+        safe_key = re.sub(r'[^A-Za-z0-9_]', '_', key)
+        return self.bank_dir / f'{safe_key}.bin'
+
+    def __write__(self, key, all_params):
+        data_path = self.__data_path__(key)
+        offsets = [0]
+        with open(data_path, 'wb') as file:
+            for params in all_params:
+                offsets.append(offsets[-1] + file.write(pickle.dumps(params, protocol=pickle.HIGHEST_PROTOCOL)))
+
+        np.save(data_path.with_suffix('.npy'), np.array(offsets, dtype=np.int64))
+
+    def __read__(self, key, idx):
+        if key not in self.maps:
+            data_path = self.__data_path__(key)
+            with open(data_path, 'rb') as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            offsets = np.load(data_path.with_suffix('.npy'), mmap_mode='r')
+            self.maps[key] = (data, offsets)
+
+        data, offsets = self.maps[key]
+        return pickle.loads(data[offsets[idx]:offsets[idx+1]])
@@ -1,9 +1,10 @@
-import copy
 import traceback
+from timeit import default_timer as timer
 
 
-from grader.student_code import StudentCode, StudentTimeoutException, TIMEOUT_S
+from grader.student_code import StudentCode, StudentTimeoutException
 from grader.feedback import params_to_str, output_to_str, diff_to_str, compare_outputs
+from grader.isolation import isolate_params, find_mutated_params
 
 class TestCaseGenerator:
     def __init__(self, fn_name, sol_code, stu_code: StudentCode):
@@ -17,6 +18,7 @@ class TestCaseGenerator:
         self.has_equality_fn = hasattr(self.sol_fn, 'equality_fn')
         self.max_trials = self.sol_fn.max_trials
         self.is_extra_credit = hasattr(self.sol_fn, 'extra_credit')
+        self.is_cached = self.sol_code.has_cached_test_cases(fn_name)
 
         if self.is_class_fn:
             self.trials_per_instance = self.sol_fn.trials_per_instance
@@ -25,6 +27,9 @@ class TestCaseGenerator:
         self.sol_instnc = None
         self.stu_instnc = None
 
+        # Parameters the student function modified, noted once in the feedback
+        self.mutated_params = set()
+
         # Log detailed failed cases every 1/3rd of the trials
         self.log_freq = max(1, self.max_trials // 3)
         self.log_next_failed_case = True
@@ -44,44 +49,76 @@ class TestCaseGenerator:
         if trial_idx % self.log_freq == 0:
             self.log_next_failed_case = True
 
-        # Generate parameters for test case. Give student deep copy to decouple references
-        sol_params = self.sol_code.create_fn_parameters(self.fn_name, trial_idx)
-        stu_params = copy.deepcopy(sol_params)
+        # Time spent in each phase is added up by the profiler
+        prof = self.stu_code.profiler
+        start_t = timer()
 
-        # Generate solution/student class instances every X iterations of the function when testing class functions
-        if self.is_class_fn and trial_idx % self.trials_per_instance == 0:
-            self.stu_code.log_postfix('Creating classes')
+        # Get the solution parameters and outputs from the precomputed cache or run the solution now
+        if self.is_cached:
+            case = self.sol_code.test_case_cache[self.fn_name][trial_idx]
+            start_t = prof.lap(self.fn_name, 'param_generation', start_t)
+        else:
+            case = self.sol_code.create_test_case(self.fn_name, trial_idx, self.sol_instnc)
+            prof.add(self.fn_name, 'solution_run', case.sol_duration_sec)
+            start_t = prof.lap(self.fn_name, 'param_generation', start_t + case.sol_duration_sec)
+
+        self.sol_instnc = case.sol_instnc
+        sol_params = case.sol_params
+        sol_output, sol_duration_sec = case.sol_output, case.sol_duration_sec
 
+        # Give student their own copy to decouple references, case.params stays untouched to find the parameters they modify
+        stu_params = isolate_params(case.params)
+        start_t = prof.lap(self.fn_name, 'param_copy', start_t)
+
+        # Generate student class instances every X iterations of the function when testing class functions
+        if self.is_class_fn and trial_idx % self.trials_per_instance == 0:
             # IMPORTANT! Both classes must be initialized with the same parameters!
-            # Give student deep copy to decouple references
-            self.sol_instnc, sol_class_init_params = self.sol_code.create_class_instance(self.fn_name)
-            stu_class_init_params = copy.deepcopy(sol_class_init_params)
+            stu_class_init_params = isolate_params(case.class_init_params)
 
             # Run the student class constructor
             try:
                 self.stu_instnc = self.stu_code.create_class_instance(self.fn_name, **stu_class_init_params)
             except Exception as ex:
+                start_t = prof.lap(self.fn_name, 'class_construction', start_t)
                 self.stu_code.write_feedback(f'Got exception [{ex}] when creating class {self.sol_instnc.__class__.__name__}')
+                prof.lap(self.fn_name, 'feedback', start_t)
                 return ex
+            start_t = prof.lap(self.fn_name, 'class_construction', start_t)
 
-        # Run and time solution function
-        self.stu_code.log_postfix('Running fns')
-        sol_output, sol_duration_sec = self.sol_code.run_fn(self.fn_name, self.sol_instnc, sol_params)
-
-        # Try to run student function
+        # Try to run student function. Failed runs (timeouts and exceptions) are timed too as they are usually the slowest
         try:
             stu_output = self.stu_code.run_fn(self.fn_name, self.stu_instnc, stu_params)
+            start_t = prof.lap(self.fn_name, 'student_run', start_t)
         except StudentTimeoutException as ex:
+            start_t = prof.lap(self.fn_name, 'student_run', start_t)
             self.stu_code.write_feedback(f'Your code took too long to run so it was timed out and stopped.')
-            self.stu_code.write_feedback(f'\tAs a reference, the solution took {sol_duration_sec:.6f}s to run. The time limit is {TIMEOUT_S}s \n')
+            self.stu_code.write_feedback(f'\tAs a reference, the solution took {sol_duration_sec:.6f}s to run. The time limit is {self.stu_code.timeout_engine.timeout_s}s \n')
+            prof.lap(self.fn_name, 'feedback', start_t)
             return ex
         except Exception as ex:
-            self.stu_code.write_feedback(f'Got exception [{ex}] when running function {self.fn_name}({params_to_str(stu_params)}).')
+            start_t = prof.lap(self.fn_name, 'student_run', start_t)
+            self.stu_code.write_feedback(lambda: f'Got exception [{ex}] when running function {self.fn_name}({params_to_str(stu_params)}).')
             self.stu_code.write_feedback(f'\t{self.stu_code.tb}\n')
+            prof.lap(self.fn_name, 'feedback', start_t)
             return ex
-        
+
+        # Running out of memory is a failed test case like a timeout
+        if isinstance(stu_output, MemoryError):
+            self.stu_code.write_feedback(f'Your code used too much memory so it was stopped. The memory limit is {self.stu_code.memory_limit.limit_mb}MB \n')
+            prof.lap(self.fn_name, 'feedback', start_t)
+            return stu_output
+
+        # Let the student know if their function modifies its input, compared to the parameters before any function ran
+        # Parameters that were already noted are not compared again
+        unchecked_params = {name: value for name, value in stu_params.items() if name not in self.mutated_params}
+        new_mutated_params = find_mutated_params(case.params, unchecked_params)
+        if new_mutated_params:
+            self.mutated_params.update(new_mutated_params)
+            self.stu_code.write_feedback(f'Note: Your function modified its input parameter(s) {sorted(new_mutated_params)} in test case #{trial_idx+1}')
+        # Checking for modified parameters is part of the cost of isolating them
+        start_t = prof.lap(self.fn_name, 'param_copy', start_t)
+
         # Compare answers between the solution and the student
-        self.stu_code.log_postfix(f'Checking equality')
         try:
             # Determine which comparison function we will be using
             if self.is_class_fn and self.has_equality_fn:
@@ -91,21 +128,24 @@ class TestCaseGenerator:
             else:
                 has_passed_test = compare_outputs(sol_output, stu_output)
         except Exception as ex:
+            start_t = prof.lap(self.fn_name, 'comparison', start_t)
             self.stu_code.write_feedback(f'### Got exception {ex} when grading {self.fn_name} when trying to compare outputs.')
             self.stu_code.write_feedback(traceback.format_exc())
+            prof.lap(self.fn_name, 'feedback', start_t)
             return ex
-        
+        start_t = prof.lap(self.fn_name, 'comparison', start_t)
+
         # Check if we need to log the next failed test case
         if not has_passed_test and self.log_next_failed_case:
             self.log_next_failed_case = False
-            self.stu_code.log_postfix(f'Logging')
 
+            # Messages are passed as functions so they are only formatted if the feedback has not been truncated
             # Only print the output differences when we are not using a custom comparer function
             # Fixes Hassan's comment about not needing to print when output return type doesn't matter
             if not self.has_equality_fn:
-                self.stu_code.write_feedback(f'Test Case #{trial_idx+1} failed | Reason => {diff_to_str(sol_output, stu_output)}')
-                self.stu_code.write_feedback(f'\t The Solution Outputs -> {self.fn_name}({params_to_str(sol_params)})={output_to_str(sol_output)}')
-                self.stu_code.write_feedback(f'\tYour Solution Outputs -> {self.fn_name}({params_to_str(stu_params)})={output_to_str(stu_output)}')
+                self.stu_code.write_feedback(lambda: f'Test Case #{trial_idx+1} failed | Reason => {diff_to_str(sol_output, stu_output)}')
+                self.stu_code.write_feedback(lambda: f'\t The Solution Outputs -> {self.fn_name}({params_to_str(sol_params)})={output_to_str(sol_output)}')
+                self.stu_code.write_feedback(lambda: f'\tYour Solution Outputs -> {self.fn_name}({params_to_str(stu_params)})={output_to_str(stu_output)}')
                 self.stu_code.write_feedback(f'')
             else:
                 self.stu_code.write_feedback(f'Test Case #{trial_idx+1} failed')
@@ -113,7 +153,8 @@ class TestCaseGenerator:
             # Use our str function to print the student class
             if self.is_class_fn:
                 str_fn = self.sol_instnc.__class__.__str__
-                self.stu_code.write_feedback(f'\tSolution Class = \n{self.sol_instnc}')
-                self.stu_code.write_feedback(f'\tYour Class = \n{str_fn(self.stu_instnc)}\n')
+                self.stu_code.write_feedback(lambda: f'\tSolution Class = \n{self.sol_instnc}')
+                self.stu_code.write_feedback(lambda: f'\tYour Class = \n{str_fn(self.stu_instnc)}\n')
 
+            prof.lap(self.fn_name, 'feedback', start_t)
         return has_passed_test
@@ -0,0 +1,151 @@
+import abc
+import signal
+from timeit import default_timer as timer
+
+from grader.constants import TIMEOUT_ENGINES
+
+
+class StudentTimeoutException(Exception):
+    """Exception that is raised when a student function takes too long to run and is timed out."""
+    pass
+
+
+def __raise_timeout__(signum, frame):
+    raise StudentTimeoutException(f'Function timed out (signal {signum})')
+
+
+class TimeoutEngine(abc.ABC):
+    """Runs student functions with a time limit, raising StudentTimeoutException when the limit is reached."""
+
+    def __init__(self, timeout_s: float):
+        self.timeout_s = timeout_s
+
+    def reset(self):
+        """Called before grading a new student."""
+        pass
+
+    @abc.abstractmethod
+    def run(self, fn_name, fn, *args, **kwargs):
+        """Runs a student function with the time limit of the engine."""
+
+    @abc.abstractmethod
+    def run_with_limit(self, limit_s, fn, *args, **kwargs):
+        """Runs a function with the given time limit instead of the limit of the engine. Used to import the student code."""
+
+
+class WraptTimeoutEngine(TimeoutEngine):
+    """Wraps every call with wrapt_timeout_decorator. Builds a new wrapper for each call, which is slow but portable."""
+
+    def run(self, fn_name, fn, *args, **kwargs):
+        return self.run_with_limit(self.timeout_s, fn, *args, **kwargs)
+
+    def run_with_limit(self, limit_s, fn, *args, **kwargs):
+        # Only imported when this engine is used as it is slow to import
+        import wrapt_timeout_decorator
+        return wrapt_timeout_decorator.timeout(limit_s, use_signals=True, timeout_exception=StudentTimeoutException)(fn)(*args, **kwargs)
+
+
+class ITimerTimeoutEngine(TimeoutEngine):
+    """
+    Installs a SIGALRM handler once per process and then only arms/disarms an interval timer around each call.
+
+    Unix only. Must be used from the main thread of the process as that is where signals are delivered.
+    """
+    timer_type = signal.ITIMER_REAL
+    timer_signal = signal.SIGALRM
+
+    def __init__(self, timeout_s: float):
+        super().__init__(timeout_s)
+        self.is_installed = False
+
+    def __getstate__(self):
+        # Signal handlers are per process, the worker installs its own
+        state = self.__dict__.copy()
+        state['is_installed'] = False
+        return state
+
+    def install(self):
+        signal.signal(self.timer_signal, __raise_timeout__)
+        self.is_installed = True
+
+    def run(self, fn_name, fn, *args, **kwargs):
+        return self.run_with_limit(self.timeout_s, fn, *args, **kwargs)
+
+    def run_with_limit(self, limit_s, fn, *args, **kwargs):
+        if not self.is_installed:
+            self.install()
+
+        signal.setitimer(self.timer_type, limit_s)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            signal.setitimer(self.timer_type, 0)
+
+
+class BudgetTimeoutEngine(ITimerTimeoutEngine):
+    """
+    Besides the limit per call, gives every function a total time budget across all of its test cases.
+
+    Once a function spends its budget, the remaining test cases time out immediately without running.
+    """
+
+    def __init__(self, timeout_s: float, budget_s: float):
+        super().__init__(timeout_s)
+        self.budget_s = budget_s
+        self.remaining_s = {}
+
+    def reset(self):
+        self.remaining_s = {}
+
+    def run(self, fn_name, fn, *args, **kwargs):
+        remaining_s = self.remaining_s.get(fn_name, self.budget_s)
+        if remaining_s <= 0:
+            raise StudentTimeoutException(f'Function used all of its {self.budget_s}s time budget')
+
+        start_t = timer()
+        try:
+            return self.run_with_limit(min(self.timeout_s, remaining_s), fn, *args, **kwargs)
+        finally:
+            self.remaining_s[fn_name] = remaining_s - (timer() - start_t)
+
+
+class CPUTimeoutEngine(ITimerTimeoutEngine):
+    """
+    Limits the CPU time (user + system) used by each call instead of the wall time, so a busy machine does not time out students.
+
+    A wall-time limit of "wall_factor" times the CPU limit is still armed to catch code that sleeps or waits.
+    """
+    timer_type = signal.ITIMER_PROF
+    timer_signal = signal.SIGPROF
+
+    def __init__(self, timeout_s: float, wall_factor: float = 10):
+        super().__init__(timeout_s)
+        self.wall_factor = wall_factor
+
+    def install(self):
+        super().install()
+        signal.signal(signal.SIGALRM, __raise_timeout__)
+
+    def run_with_limit(self, limit_s, fn, *args, **kwargs):
+        if not self.is_installed:
+            self.install()
+
+        signal.setitimer(signal.ITIMER_REAL, limit_s * self.wall_factor)
+        try:
+            return super().run_with_limit(limit_s, fn, *args, **kwargs)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def create_timeout_engine(name: str, timeout_s: float, budget_s: float):
+    """Creates the timeout engine with the given name."""
+    if name == 'itimer':
+        return ITimerTimeoutEngine(timeout_s)
+    elif name == 'budget':
+        return BudgetTimeoutEngine(timeout_s, budget_s)
+    elif name == 'cpu':
+        return CPUTimeoutEngine(timeout_s)
+    elif name == 'wrapt':
+        return WraptTimeoutEngine(timeout_s)
+    else:
+        raise Exception(f'[Debug] Unknown timeout engine {name}, must be one of {TIMEOUT_ENGINES}')
@@ -1,4 +1,3 @@
-import numpy as np
 import inspect
 
 # Functions that don't require @no_test_cases to be ignored
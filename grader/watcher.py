@@ -0,0 +1,117 @@
+import time
+import pathlib
+import traceback
+from timeit import default_timer as timer
+
+from grader.constants import WATCH_INTERVAL_S
+
+
+def __file_signature__(fpath: pathlib.Path):
+    stat = fpath.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SubmissionWatcher:
+    """
+    Keeps the grader loaded (libraries, overrides, and solution) and grades submissions as soon as they arrive.
+
+    The student directory is checked every interval. A new or changed file is graded once it stayed the same
+    for a whole interval so files that are still being copied are not graded half-written.
+    When the solution file changes it is reloaded and every student is graded again.
+    """
+
+    def __init__(self, grader, interval_s: float = WATCH_INTERVAL_S):
+        self.grader = grader
+        self.interval_s = interval_s
+
+    def snapshot(self):
+        """Gets the signature (modification time and size) of every submission in the student directory."""
+        files = {}
+        for pattern in ['*.py', '*.ipynb']:
+            for fpath in self.grader.student_dir.glob(pattern):
+                try:
+                    files[fpath] = __file_signature__(fpath)
+                except FileNotFoundError:
+                    continue
+        return files
+
+    def run(self):
+        """Grades all students and then keeps grading new and changed submissions until stopped with Ctrl+C."""
+        # Take the snapshot before the first pass so submissions that arrive during it are graded afterwards
+        solution_signature = __file_signature__(self.grader.solution_file)
+        self.grader.convert_all_student_jupyter_to_py()
+        self.seen = self.snapshot()
+        self.grader.grade_all_students()
+
+        print(f'[Debug] Watching {self.grader.student_dir} for new submissions every {self.interval_s}s, press Ctrl+C to stop')
+        pending = {}
+        try:
+            while True:
+                time.sleep(self.interval_s)
+
+                if __file_signature__(self.grader.solution_file) != solution_signature:
+                    solution_signature = __file_signature__(self.grader.solution_file)
+                    self.run_batch(self.reload_solution)
+                    pending = {}
+                    continue
+
+                current = self.snapshot()
+                changed = {fpath: signature for fpath, signature in current.items() if self.seen.get(fpath) != signature}
+
+                # Only grade the files that did not change since the last check
+                ready = [fpath for fpath, signature in changed.items() if pending.get(fpath) == signature]
+                pending = changed
+                self.seen = {fpath: signature for fpath, signature in self.seen.items() if fpath in current}
+                if ready:
+                    for fpath in ready:
+                        self.seen[fpath] = current[fpath]
+                    self.run_batch(self.grade_submissions, ready)
+        except KeyboardInterrupt:
+            print('[Debug] Stopped watching for new submissions')
+
+    def run_batch(self, batch_fn, *args):
+        """Runs a batch of grading, logging any exception so one bad batch does not stop the watcher."""
+        try:
+            batch_fn(*args)
+        except Exception:
+            print(f'[Debug] Watching continues after an exception in {batch_fn.__name__}()')
+            traceback.print_exc()
+
+    def grade_submissions(self, fpaths: list):
+        """Grades the given new or changed submissions and updates the summary."""
+        start_t = timer()
+        code_fpaths = [fpath for fpath in fpaths if fpath.suffix == '.py']
+        for fpath in fpaths:
+            if fpath.suffix == '.ipynb':
+                # A resubmitted notebook replaces the script converted from the previous one
+                fpath.with_suffix('.py').unlink(missing_ok=True)
+                self.grader.convert_one_student_jupyter_to_py(fpath)
+                if fpath.with_suffix('.py').exists():
+                    code_fpaths.append(fpath.with_suffix('.py'))
+                    self.seen[fpath.with_suffix('.py')] = __file_signature__(fpath.with_suffix('.py'))
+
+        # New attempts change the attempt numbers so look for the student files again
+        self.grader.set_student_files(self.grader.find_student_files())
+        code_fpaths = [fpath for fpath in code_fpaths if fpath in self.grader.all_student_files]
+        if not code_fpaths:
+            return
+
+        print(f'[Debug] Grading {len(code_fpaths)} new or changed submissions {[fpath.name for fpath in code_fpaths]}')
+        self.grader.grade_files(code_fpaths)
+        self.grader.write_summary()
+        print(f'[Debug] Graded {len(code_fpaths)} submissions in {timer()-start_t:.2f}sec')
+
+    def reload_solution(self):
+        """Reloads the changed solution and grades every student again."""
+        print(f'[Debug] Solution {self.grader.solution_file} changed, reloading it and grading all students again')
+        start_t = timer()
+        try:
+            self.grader.load_solution()
+        except Exception as ex:
+            print(f'[Debug] Could not reload the solution due to exception [{ex}], still grading with the previous one')
+            return
+        self.grader.set_student_files(self.grader.find_student_files())
+        self.grader.grade_files(list(self.grader.all_student_files))
+        self.grader.write_summary()
+        self.seen = self.snapshot()
+        print(f'[Debug] Graded all students with the new solution in {timer()-start_t:.2f}sec')
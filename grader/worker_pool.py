@@ -0,0 +1,42 @@
+import multiprocessing
+
+# The grader used by the current worker process. Set once per worker by __init_worker__()
+worker_grader = None
+
+
+def __init_worker__(grader):
+    global worker_grader
+    worker_grader = grader
+
+
+def __grade_student__(fpath):
+    return worker_grader.grade_one_student(fpath)
+
+
+class WorkerPool:
+    """
+    Pool of processes that grade students in parallel.
+
+    Each worker receives the grader (and with it the solution) once when it starts instead of with every task,
+    and only the student file paths are sent as tasks. Scores are streamed back as soon as each student finishes.
+    """
+
+    def __init__(self, grader, n_workers: int, chunksize: int = 1, max_tasks_per_child: int = None):
+        self.grader = grader
+        self.n_workers = n_workers
+        self.chunksize = chunksize
+        self.max_tasks_per_child = max_tasks_per_child
+
+    def __enter__(self):
+        # Workers are replaced after grading "max_tasks_per_child" students to release anything student code left behind
+        self.pool = multiprocessing.Pool(self.n_workers, initializer=__init_worker__, initargs=(self.grader,),
+                                         maxtasksperchild=self.max_tasks_per_child)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.pool.terminate()
+        self.pool.join()
+
+    def imap_grade(self, fpaths):
+        """Grades the given student files, yielding the scores of each student in the order they finish."""
+        return self.pool.imap_unordered(__grade_student__, fpaths, chunksize=self.chunksize)
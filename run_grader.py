@@ -4,24 +4,50 @@ import zipfile
 from timeit import default_timer as timer
 
 
-from grader import Grader
-import grader.student_code
+# Only the defaults of the arguments are imported before parsing them, the grader itself is imported once they are valid
+from grader.constants import TIMEOUT_ENGINES, WATCH_INTERVAL_S, TIMEOUT_S, TIMEOUT_BUDGET_S, IMPORT_TIMEOUT_S
 
 
 def is_code_file(file_str):
     return file_str[-3:] == '.py' or file_str[-6:] == '.ipynb'
 
 
-if __name__ == '__main__':
-
+def create_parser():
+    """Creates the parser of the command-line arguments of the grader."""
     # Parse arguments from the command-line
     parser = argparse.ArgumentParser()
-    parser.add_argument('-sol', '--solution_file', type=pathlib.Path, required=True)
+    parser.add_argument('-sol', '--solution_file', type=pathlib.Path, required=False)
     parser.add_argument('-sd', '--student_dir', type=pathlib.Path, required=False)
     parser.add_argument('-mg', '--max_grade', type=float, required=False, default=100)
     parser.add_argument('-mp', '--multiprocessing', type=int, required=False, default=1)
+    parser.add_argument('-wm', '--worker_model', choices=['pool', 'forkserver'], required=False, default='pool', help='Grade with a pool of long-lived workers or fork a fresh process per student from the warm grader')
+    parser.add_argument('-cz', '--chunksize', type=int, required=False, default=1, help='How many students to send to a worker at once when using multiprocessing')
+    parser.add_argument('-mt', '--max_tasks_per_child', type=int, required=False, default=None, help='Replace each worker process after grading this many students')
+    parser.add_argument('-te', '--timeout_engine', choices=TIMEOUT_ENGINES, required=False, default='itimer', help='How student functions are timed out')
+    parser.add_argument('-inc', '--incremental', action='store_true', help='Reuse the scores and feedback of submissions that did not change since they were last graded')
+    parser.add_argument('-r', '--resume', action='store_true', help='Skip the students that were already graded by a previous run according to its journal')
+    parser.add_argument('-lo', '--latest_only', action='store_true', help='Grade only the most recent Blackboard attempt of each student and mark the older attempts as superseded')
+    parser.add_argument('-p', '--profile', action='store_true', help='Time every grading phase and save a profiling report of all students and functions')
     parser.add_argument('-s', '--students', nargs='+', required=False)
     parser.add_argument('-d', '--debug', type=bool, required=False, default=False)
+    parser.add_argument('-seed', '--seed', type=int, required=False, default=None, help='Generate all test cases once from this seed and share them with all students')
+    parser.add_argument('-cs', '--cache_solution', action='store_true', help='Run the solution once per test case before grading and share the outputs with all students')
+    parser.add_argument('-ts', '--timeout_s', type=float, required=False, default=TIMEOUT_S, help='How many seconds each student function call can run before being timed out')
+    parser.add_argument('-tb', '--timeout_budget_s', type=float, required=False, default=TIMEOUT_BUDGET_S, help='How many seconds all test cases of a function can take together with the budget timeout engine')
+    parser.add_argument('-it', '--import_timeout_s', type=float, required=False, default=IMPORT_TIMEOUT_S, help='How many seconds the top-level code of each student can run when it is imported')
+    parser.add_argument('-ml', '--memory_limit_mb', type=float, required=False, default=None, help='How many MB of memory each student can allocate on top of what the grader uses')
+    parser.add_argument('-q', '--queue_dir', type=pathlib.Path, required=False, default=None, help='Coordinate the grading through this directory (on a shared filesystem) with workers started with --worker')
+    parser.add_argument('-w', '--worker', type=pathlib.Path, required=False, default=None, help='Run --multiprocessing workers that grade the students published to this queue directory by a coordinator')
+    parser.add_argument('--lease_s', type=float, required=False, default=600, help='Seconds a worker can take to grade a student before the coordinator gives it to another worker')
+    parser.add_argument('--watch', action='store_true', help='Keep running and grade new or changed submissions as they arrive, reloading the solution when it changes')
+    parser.add_argument('--watch_interval_s', type=float, required=False, default=WATCH_INTERVAL_S, help='How often to check for new submissions with --watch')
+    return parser
+
+
+if __name__ == '__main__':
+
+    # Parse arguments from the command-line
+    parser = create_parser()
     args = parser.parse_args()
 
 
@@ -42,10 +68,18 @@ if __name__ == '__main__':
     """)
     # Debug flags
     if args.debug:
+        import grader.student_code
         grader.student_code.DEBUG = True
         args.multiprocessing = 1
         args.students = ['jperez50']
 
+    # Workers get the solution and the students from the coordinator
+    if args.worker:
+        from grader.distributed import run_workers
+        run_workers(args.worker, args.multiprocessing)
+        exit()
+
+    assert args.solution_file, f'--solution_file is required'
     assert args.solution_file.exists(), f'--solution_file {args.solution_file} does not exist'
 
     if not args.student_dir:
@@ -84,11 +118,20 @@ if __name__ == '__main__':
         assert args.student_dir.exists(), f'--student_dir {args.student_dir} does not exist'
 
     # Grading Pipeline
+    from grader import Grader
     print(f'[Debug] Grading {args.solution_file} with student code located at {args.student_dir}')
     print(f'[Debug] Complete Args = {args}')
 
     start_time = timer()
     grader = Grader(args)
+
+    # Keep grading submissions as they arrive until stopped with Ctrl+C
+    if args.watch:
+        assert not args.queue_dir, '--watch cannot be used with --queue_dir'
+        from grader.watcher import SubmissionWatcher
+        SubmissionWatcher(grader, args.watch_interval_s).run()
+        exit()
+
     grader.convert_all_student_jupyter_to_py()
     grader.grade_all_students()
     end_time = timer()